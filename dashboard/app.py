@@ -1,21 +1,19 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import numpy as np
 import os
 import sys
 
 # Add parent directory to path to import pipeline modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from dashboard.filters import create_filters
+from dashboard.filters import create_filters, render_live_statistics
 from dashboard.charts import (
     create_choropleth_map,
     create_age_sex_pyramid,
     create_population_summary_chart
 )
-from dashboard.text_blocks import get_public_health_insights
+from dashboard.text_blocks import get_public_health_insights, calculate_demographic_metrics
 
 def setup_page():
     """Configure Streamlit page settings"""
@@ -32,131 +30,209 @@ def setup_page():
     Explore population patterns to inform public health planning and resource allocation.
     """)
 
+# Sample district populations as (male, female) base values per country
+SAMPLE_DISTRICT_POPULATIONS = {
+    'KEN': {
+        'Nairobi': (400000, 380000),
+        'Mombasa': (150000, 145000),
+        'Kisumu': (100000, 95000),
+        'Nakuru': (120000, 115000),
+        'Eldoret': (70000, 68000)
+    },
+    'UGA': {
+        'Kampala': (350000, 340000),
+        'Gulu': (80000, 78000),
+        'Lira': (70000, 68000),
+        'Mbale': (85000, 83000),
+        'Jinja': (75000, 73000)
+    }
+}
+SAMPLE_AGE_GROUPS = ['0-4', '5-9', '10-14', '15-19', '20-24', '25-29']
+SAMPLE_AGE_FACTORS = np.array([1.1, 1.0, 0.9, 0.8, 0.7, 0.6])
+SAMPLE_SEXES = ['M', 'F']
+
+# Categorical dtypes for the dimension columns. Any groupby on these columns
+# must pass observed=True to avoid expanding over unused category combinations.
+SAMPLE_CATEGORY_DTYPES = {
+    'country': pd.CategoricalDtype(list(SAMPLE_DISTRICT_POPULATIONS)),
+    'district': pd.CategoricalDtype([
+        district
+        for district_populations in SAMPLE_DISTRICT_POPULATIONS.values()
+        for district in district_populations
+    ]),
+    'age_group': pd.CategoricalDtype(SAMPLE_AGE_GROUPS, ordered=True),
+    'sex': pd.CategoricalDtype(SAMPLE_SEXES)
+}
+
+def _build_sample_frame():
+    """Build the country/district × age group × sex sample frame in one pass"""
+    dtypes = SAMPLE_CATEGORY_DTYPES
+    
+    # One entry per district across all countries, in district category order
+    district_country = np.repeat(
+        np.arange(len(SAMPLE_DISTRICT_POPULATIONS)),
+        [len(district_populations) for district_populations in SAMPLE_DISTRICT_POPULATIONS.values()]
+    )
+    base_pop = np.array([
+        populations
+        for district_populations in SAMPLE_DISTRICT_POPULATIONS.values()
+        for populations in district_populations.values()
+    ])
+    
+    # Row-major index arrays over the district × age group × sex product
+    district_idx, age_idx, sex_idx = np.indices(
+        (len(base_pop), len(SAMPLE_AGE_GROUPS), len(SAMPLE_SEXES))
+    ).reshape(3, -1)
+    
+    # Categorical columns are built straight from their codes, so no
+    # intermediate string arrays are materialised and re-encoded
+    return pd.DataFrame({
+        'district': pd.Categorical.from_codes(district_idx, dtype=dtypes['district']),
+        'age_group': pd.Categorical.from_codes(age_idx, dtype=dtypes['age_group']),
+        'sex': pd.Categorical.from_codes(sex_idx, dtype=dtypes['sex']),
+        'population': (base_pop[district_idx, sex_idx] * SAMPLE_AGE_FACTORS[age_idx]).astype(np.int32),
+        'country': pd.Categorical.from_codes(district_country[district_idx], dtype=dtypes['country'])
+    })
+
+@st.cache_resource
 def load_sample_data():
     """
     Load sample aggregated data for demonstration.
     In a full implementation, this would come from the data pipeline.
+    
+    Both countries are built directly into one master frame. It is cached
+    as a shared resource rather than pickled per hit, so the same object is
+    returned on every rerun; it must never be mutated in place. Filtering
+    and aggregation always produce new frames.
     """
     # Sample data structure matching what the pipeline would produce
     # 5 districts × 6 age groups × 2 sexes = 60 records per country
+    return _build_sample_frame()
+
+@st.cache_data
+def get_filtered_data(selected_country, selected_age_groups, selected_sex):
+    """
+    Apply the sidebar selections to the master frame.
     
-    # Kenya data
-    kenya_districts = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret']
-    kenya_age_groups = ['0-4', '5-9', '10-14', '15-19', '20-24', '25-29']
-    kenya_sexes = ['M', 'F']
-    
-    # Create Kenya data with exactly 60 records
-    kenya_data = []
-    for district in kenya_districts:
-        for age_group in kenya_age_groups:
-            for sex in kenya_sexes:
-                # Generate sample population data
-                if district == 'Nairobi':
-                    base_pop = 400000 if sex == 'M' else 380000
-                elif district == 'Mombasa':
-                    base_pop = 150000 if sex == 'M' else 145000
-                elif district == 'Kisumu':
-                    base_pop = 100000 if sex == 'M' else 95000
-                elif district == 'Nakuru':
-                    base_pop = 120000 if sex == 'M' else 115000
-                else:  # Eldoret
-                    base_pop = 70000 if sex == 'M' else 68000
-                
-                # Adjust by age group
-                age_factor = {
-                    '0-4': 1.1, '5-9': 1.0, '10-14': 0.9, 
-                    '15-19': 0.8, '20-24': 0.7, '25-29': 0.6
-                }[age_group]
-                
-                population = int(base_pop * age_factor)
-                
-                kenya_data.append({
-                    'district': district,
-                    'age_group': age_group,
-                    'sex': sex,
-                    'population': population,
-                    'country': 'KEN'
-                })
-    
-    # Uganda data
-    uganda_districts = ['Kampala', 'Gulu', 'Lira', 'Mbale', 'Jinja']
-    uganda_age_groups = ['0-4', '5-9', '10-14', '15-19', '20-24', '25-29']
-    uganda_sexes = ['M', 'F']
-    
-    # Create Uganda data with exactly 60 records
-    uganda_data = []
-    for district in uganda_districts:
-        for age_group in uganda_age_groups:
-            for sex in uganda_sexes:
-                # Generate sample population data
-                if district == 'Kampala':
-                    base_pop = 350000 if sex == 'M' else 340000
-                elif district == 'Gulu':
-                    base_pop = 80000 if sex == 'M' else 78000
-                elif district == 'Lira':
-                    base_pop = 70000 if sex == 'M' else 68000
-                elif district == 'Mbale':
-                    base_pop = 85000 if sex == 'M' else 83000
-                else:  # Jinja
-                    base_pop = 75000 if sex == 'M' else 73000
-                
-                # Adjust by age group
-                age_factor = {
-                    '0-4': 1.1, '5-9': 1.0, '10-14': 0.9, 
-                    '15-19': 0.8, '20-24': 0.7, '25-29': 0.6
-                }[age_group]
-                
-                population = int(base_pop * age_factor)
-                
-                uganda_data.append({
-                    'district': district,
-                    'age_group': age_group,
-                    'sex': sex,
-                    'population': population,
-                    'country': 'UGA'
-                })
-    
-    # Create DataFrames
-    kenya_df = pd.DataFrame(kenya_data)
-    uganda_df = pd.DataFrame(uganda_data)
-    
-    return {
-        'KEN': kenya_df,
-        'UGA': uganda_df
-    }
+    Cached on the selection itself, so age groups must be passed as a tuple.
+    """
+    all_data = load_sample_data()
+    
+    # Build one combined mask and slice once instead of chaining filters
+    mask = np.ones(len(all_data), dtype=bool)
+    if selected_country != "All":
+        mask &= (all_data['country'] == selected_country).to_numpy()
+    if selected_sex != "All":
+        mask &= (all_data['sex'] == selected_sex).to_numpy()
+    if selected_age_groups:
+        mask &= all_data['age_group'].isin(selected_age_groups).to_numpy()
+    return all_data[mask]
+
+def get_session_filtered_data(selection):
+    """
+    Return the filtered frame for a selection, shared through session state.
+    
+    The frame is only fetched from get_filtered_data when the selection
+    changes, so reruns with the same filters reuse the object already held
+    by the session instead of unpickling another cached copy.
+    """
+    if st.session_state.get('filter_key') != selection:
+        st.session_state['filtered_data'] = get_filtered_data(*selection)
+        st.session_state['filter_key'] = selection
+    return st.session_state['filtered_data']
+
+def summarize_population(data):
+    """
+    Sum population by country, district, age group and sex.
+    
+    Charts and metrics roll up from this single aggregate instead of
+    grouping the filtered frame again for each view.
+    """
+    return data.groupby(['country', 'district', 'age_group', 'sex'], observed=True)['population'].sum()
+
+@st.cache_data
+def get_population_rollups(selected_country, selected_age_groups, selected_sex):
+    """
+    Aggregate the filtered frame and derive the rollups each view needs.
+    
+    Returns:
+        tuple: (population_totals, age_sex_totals, district_totals, sex_totals)
+    """
+    filtered_data = get_filtered_data(selected_country, selected_age_groups, selected_sex)
+    
+    # Aggregate once at the finest grain; every view rolls up from this
+    population_totals = summarize_population(filtered_data)
+    age_sex_totals = population_totals.groupby(level=['age_group', 'sex'], observed=True).sum().reset_index()
+    district_totals = population_totals.groupby(level=['country', 'district'], observed=True).sum().reset_index()
+    sex_totals = population_totals.groupby(level='sex', observed=True).sum()
+    return population_totals, age_sex_totals, district_totals, sex_totals
+
+@st.cache_data
+def get_population_metrics(selected_country, selected_age_groups, selected_sex):
+    """
+    Demographic metrics for a filter selection.
+    
+    Returns:
+        DemographicMetrics or None: Metrics, or None when no rows match the filters
+    """
+    filtered_data = get_filtered_data(selected_country, selected_age_groups, selected_sex)
+    if filtered_data.empty:
+        return None
+    
+    _, age_sex_totals, _, _ = get_population_rollups(selected_country, selected_age_groups, selected_sex)
+    return calculate_demographic_metrics(age_sex_totals)
+
+@st.cache_data
+def get_chart_figures(selected_country, selected_age_groups, selected_sex):
+    """
+    Build the map, pyramid and summary figures for a filter selection.
+    
+    Figures are cached as plain dicts so reruns with an unchanged selection
+    skip both the aggregation and the Plotly trace construction.
+    """
+    _, age_sex_totals, district_totals, _ = get_population_rollups(
+        selected_country, selected_age_groups, selected_sex
+    )
+    return (
+        create_choropleth_map(district_totals, selected_country).to_dict(),
+        create_age_sex_pyramid(age_sex_totals).to_dict(),
+        create_population_summary_chart(age_sex_totals).to_dict()
+    )
 
 def main():
     """Main dashboard application"""
     setup_page()
     
     # Load data
-    sample_data = load_sample_data()
-    all_data = pd.concat(sample_data.values(), ignore_index=True)
+    all_data = load_sample_data()
     
     # Create filters in sidebar
     st.sidebar.header("🔍 Filter Data")
     selected_country, selected_age_groups, selected_sex = create_filters(all_data)
     
-    # Apply filters
-    filtered_data = all_data.copy()
-    if selected_country != "All":
-        filtered_data = filtered_data[filtered_data['country'] == selected_country]
-    if selected_sex != "All":
-        filtered_data = filtered_data[filtered_data['sex'] == selected_sex]
-    if selected_age_groups:
-        filtered_data = filtered_data[filtered_data['age_group'].isin(selected_age_groups)]
+    # Apply filters. Age groups are sorted so the same set of groups always
+    # maps to the same cache key whatever order they were picked in.
+    selection = (selected_country, tuple(sorted(selected_age_groups)), selected_sex)
+    filtered_data = get_session_filtered_data(selection)
+    
+    # Real-time statistics panel
+    render_live_statistics(all_data, filtered_data, selected_age_groups, cache_key=selection)
+    
+    population_totals, age_sex_totals, district_totals, sex_totals = get_population_rollups(*selection)
+    metrics = get_population_metrics(*selection)
+    fig_map, fig_pyramid, fig_summary = get_chart_figures(*selection)
     
     # Display public health insights
     st.header("📊 Public Health Insights")
-    get_public_health_insights(filtered_data, selected_country, selected_age_groups, selected_sex)
+    get_public_health_insights(metrics, selected_country, selected_age_groups, selected_sex)
     
     # Key metrics
     st.header("📈 Key Population Metrics")
     col1, col2, col3, col4 = st.columns(4)
     
-    total_population = filtered_data['population'].sum()
-    male_population = filtered_data[filtered_data['sex'] == 'M']['population'].sum()
-    female_population = filtered_data[filtered_data['sex'] == 'F']['population'].sum()
+    total_population = sex_totals.sum()
+    male_population = sex_totals.get('M', 0)
+    female_population = sex_totals.get('F', 0)
     
     with col1:
         st.metric("Total Population", f"{total_population:,}")
@@ -177,26 +253,20 @@ def main():
     
     with col1:
         st.subheader("Population Distribution by District")
-        fig_map = create_choropleth_map(filtered_data, selected_country)
         st.plotly_chart(fig_map, use_container_width=True)
     
     with col2:
         st.subheader("Age-Sex Pyramid")
-        fig_pyramid = create_age_sex_pyramid(filtered_data)
         st.plotly_chart(fig_pyramid, use_container_width=True)
     
     # Summary chart
     st.subheader("Population Summary")
-    fig_summary = create_population_summary_chart(filtered_data)
     st.plotly_chart(fig_summary, use_container_width=True)
     
     # Data table
     st.header("📋 Detailed Data")
     st.dataframe(
-        filtered_data.groupby(['country', 'district', 'age_group', 'sex'])['population']
-        .sum()
-        .reset_index()
-        .sort_values('population', ascending=False),
+        population_totals.sort_values(ascending=False).reset_index(),
         use_container_width=True
     )
 
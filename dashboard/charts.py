@@ -1,7 +1,55 @@
-import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import pandas as pd
+import numpy as np
+
+# Dashboard frames use categorical dimension columns. Every groupby must pass
+# observed=True so results are not expanded over unused category combinations.
+
+# Sample district coordinates for demonstration
+# In production, these would come from GADM GeoJSON files
+SAMPLE_COORDS = {
+    'Nairobi': {'lat': -1.286389, 'lon': 36.817223},
+    'Mombasa': {'lat': -4.0435, 'lon': 39.6682},
+    'Kisumu': {'lat': -0.1022, 'lon': 34.7617},
+    'Nakuru': {'lat': -0.3031, 'lon': 36.0800},
+    'Eldoret': {'lat': 0.5143, 'lon': 35.2698},
+    'Kampala': {'lat': 0.3476, 'lon': 32.5825},
+    'Gulu': {'lat': 2.7663, 'lon': 32.3057},
+    'Lira': {'lat': 2.2350, 'lon': 32.9097},
+    'Mbale': {'lat': 1.0647, 'lon': 34.1794},
+    'Jinja': {'lat': 0.4473, 'lon': 33.2026}
+}
+
+# Flattened lookup tables built once at import. The trailing 0 entry is what
+# get_indexer's -1 (unknown district) resolves to.
+_DISTRICT_INDEX = pd.Index(list(SAMPLE_COORDS))
+_DISTRICT_LATS = np.array([coords['lat'] for coords in SAMPLE_COORDS.values()] + [0.0])
+_DISTRICT_LONS = np.array([coords['lon'] for coords in SAMPLE_COORDS.values()] + [0.0])
+
+# Static layout for each chart; only data-dependent settings are added per render
+MAP_LAYOUT = dict(
+    title="Population Distribution by District",
+    margin={"r":0,"t":30,"l":0,"b":0},
+    height=500
+)
+
+PYRAMID_LAYOUT = dict(
+    title="Age-Sex Population Pyramid",
+    barmode='overlay',
+    yaxis=dict(title="Age Group"),
+    showlegend=True,
+    height=500,
+    bargap=0.1
+)
+
+SUMMARY_LAYOUT = dict(
+    title="Population by Age Group and Sex",
+    barmode='group',
+    legend=dict(title=dict(text='Sex')),
+    xaxis=dict(title='Age Group', categoryorder='category ascending'),
+    yaxis=dict(title='Population', tickformat=','),
+    height=400
+)
 
 def create_choropleth_map(data, selected_country):
     """
@@ -10,51 +58,55 @@ def create_choropleth_map(data, selected_country):
     Note: This uses sample district data. In production, this would use
     actual GADM GeoJSON boundaries and proper spatial joins.
     """
-    # Aggregate data by district
-    district_data = data.groupby(['country', 'district'])['population'].sum().reset_index()
-    
-    # Create sample coordinates for demonstration
-    # In production, these would come from GADM GeoJSON files
-    sample_coords = {
-        'Nairobi': {'lat': -1.286389, 'lon': 36.817223},
-        'Mombasa': {'lat': -4.0435, 'lon': 39.6682},
-        'Kisumu': {'lat': -0.1022, 'lon': 34.7617},
-        'Nakuru': {'lat': -0.3031, 'lon': 36.0800},
-        'Eldoret': {'lat': 0.5143, 'lon': 35.2698},
-        'Kampala': {'lat': 0.3476, 'lon': 32.5825},
-        'Gulu': {'lat': 2.7663, 'lon': 32.3057},
-        'Lira': {'lat': 2.2350, 'lon': 32.9097},
-        'Mbale': {'lat': 1.0647, 'lon': 34.1794},
-        'Jinja': {'lat': 0.4473, 'lon': 33.2026}
-    }
+    if data.empty:
+        return EMPTY_FIGURE
     
-    # Add coordinates to data
-    district_data['lat'] = district_data['district'].map(lambda x: sample_coords.get(x, {}).get('lat', 0))
-    district_data['lon'] = district_data['district'].map(lambda x: sample_coords.get(x, {}).get('lon', 0))
+    # Aggregate data by district
+    district_data = data.groupby(['country', 'district'], observed=True)['population'].sum().reset_index()
     
-    # Filter by selected country if applicable
+    # Filter by selected country first so fewer rows need coordinates
     if selected_country != "All":
-        district_data = district_data[district_data['country'] == selected_country]
-    
-    # Create scatter map
-    fig = px.scatter_mapbox(
-        district_data,
-        lat="lat",
-        lon="lon",
-        size="population",
-        color="population",
-        hover_name="district",
-        hover_data={"population": True, "country": True},
-        color_continuous_scale="Viridis",
-        size_max=50,
-        zoom=5,
-        title="Population Distribution by District"
+        district_data = district_data[district_data['country'] == selected_country].copy()
+    
+    # Add coordinates with one index lookup and a gather per axis
+    coord_idx = _DISTRICT_INDEX.get_indexer(district_data['district'])
+    district_data['lat'] = _DISTRICT_LATS[coord_idx]
+    district_data['lon'] = _DISTRICT_LONS[coord_idx]
+    
+    # Build the scatter map trace directly from the aggregated arrays,
+    # sizing markers by area so the most populous district is size_max across
+    population = district_data['population'].to_numpy()
+    size_max = 50
+    sizeref = population.max() / (size_max ** 2) if len(population) > 0 else 1
+    
+    map_trace = go.Scattermapbox(
+        lat=district_data['lat'].to_numpy(),
+        lon=district_data['lon'].to_numpy(),
+        mode='markers',
+        marker=dict(
+            size=population,
+            sizemode='area',
+            sizeref=sizeref,
+            color=population,
+            colorscale='Viridis',
+            showscale=True,
+            colorbar=dict(title='population')
+        ),
+        text=district_data['district'].astype(str).to_numpy(),
+        customdata=district_data['country'].astype(str).to_numpy(),
+        hovertemplate='<b>%{text}</b><br>population=%{marker.color:,}<br>country=%{customdata}<extra></extra>'
     )
     
-    fig.update_layout(
-        mapbox_style="open-street-map",
-        margin={"r":0,"t":30,"l":0,"b":0},
-        height=500
+    fig = go.Figure(
+        data=[map_trace],
+        layout={
+            **MAP_LAYOUT,
+            'mapbox': dict(
+                style="open-street-map",
+                zoom=5,
+                center=dict(lat=district_data['lat'].mean(), lon=district_data['lon'].mean())
+            )
+        }
     )
     
     return fig
@@ -64,52 +116,47 @@ def create_age_sex_pyramid(data):
     Create an age-sex population pyramid
     """
     if data.empty:
-        return create_empty_figure("No data available for selected filters")
+        return EMPTY_FIGURE
     
-    # Prepare data for pyramid
-    pyramid_data = data.groupby(['age_group', 'sex'])['population'].sum().reset_index()
-    
-    # Create separate dataframes for males and females
-    males = pyramid_data[pyramid_data['sex'] == 'M'].sort_values('age_group')
-    females = pyramid_data[pyramid_data['sex'] == 'F'].sort_values('age_group')
-    
-    # Create pyramid
-    fig = go.Figure()
+    # Prepare data for pyramid: one row per age group, one column per sex
+    pyramid_data = (
+        data.groupby(['age_group', 'sex'], observed=True)['population'].sum()
+        .unstack('sex', fill_value=0)
+        .reindex(columns=['M', 'F'], fill_value=0)
+    )
+    age_groups = pyramid_data.index.astype(str)
+    max_population = pyramid_data.to_numpy().max()
     
-    # Add male bars (left side, negative values)
-    fig.add_trace(go.Bar(
-        y=males['age_group'],
-        x=-males['population'],
+    # Male bars on the left (negative values), female bars on the right
+    male_bar = go.Bar(
+        y=age_groups,
+        x=-pyramid_data['M'].to_numpy(),
         name='Male',
         orientation='h',
         marker_color='lightblue',
         hovertemplate='Male: %{x:,}<extra></extra>'
-    ))
-    
-    # Add female bars (right side, positive values)
-    fig.add_trace(go.Bar(
-        y=females['age_group'],
-        x=females['population'],
+    )
+    female_bar = go.Bar(
+        y=age_groups,
+        x=pyramid_data['F'].to_numpy(),
         name='Female',
         orientation='h',
         marker_color='lightpink',
         hovertemplate='Female: %{x:,}<extra></extra>'
-    ))
+    )
     
-    # Update layout for pyramid appearance
-    fig.update_layout(
-        title="Age-Sex Population Pyramid",
-        barmode='overlay',
-        xaxis=dict(
-            title="Population",
-            tickformat=",",
-            tickvals=[-max(pyramid_data['population']), 0, max(pyramid_data['population'])],
-            ticktext=[f"{max(pyramid_data['population']):,}", "0", f"{max(pyramid_data['population']):,}"]
-        ),
-        yaxis=dict(title="Age Group"),
-        showlegend=True,
-        height=500,
-        bargap=0.1
+    # Only the symmetric population axis depends on the data
+    fig = go.Figure(
+        data=[male_bar, female_bar],
+        layout={
+            **PYRAMID_LAYOUT,
+            'xaxis': dict(
+                title="Population",
+                tickformat=",",
+                tickvals=[-max_population, 0, max_population],
+                ticktext=[f"{max_population:,}", "0", f"{max_population:,}"]
+            )
+        }
     )
     
     return fig
@@ -119,40 +166,45 @@ def create_population_summary_chart(data):
     Create a summary chart showing population by age group and sex
     """
     if data.empty:
-        return create_empty_figure("No data available for selected filters")
-    
-    # Aggregate data
-    summary_data = data.groupby(['age_group', 'sex'])['population'].sum().reset_index()
-    
-    # Create grouped bar chart
-    fig = px.bar(
-        summary_data,
-        x='age_group',
-        y='population',
-        color='sex',
-        barmode='group',
-        title="Population by Age Group and Sex",
-        labels={'population': 'Population', 'age_group': 'Age Group', 'sex': 'Sex'},
-        color_discrete_map={'M': 'lightblue', 'F': 'lightpink'}
-    )
-    
-    fig.update_layout(
-        height=400,
-        xaxis={'categoryorder': 'category ascending'},
-        yaxis={'tickformat': ','}
+        return EMPTY_FIGURE
+    
+    # Aggregate data into one column per sex
+    summary_data = data.groupby(['age_group', 'sex'], observed=True)['population'].sum().unstack('sex', fill_value=0)
+    age_groups = summary_data.index.astype(str)
+    
+    # Create grouped bar chart with one trace per sex
+    sex_colors = {'M': 'lightblue', 'F': 'lightpink'}
+    fig = go.Figure(
+        data=[
+            go.Bar(
+                x=age_groups,
+                y=summary_data[sex].to_numpy(),
+                name=sex,
+                marker_color=color,
+                hovertemplate=f'Sex={sex}<br>Age Group=%{{x}}<br>Population=%{{y:,}}<extra></extra>'
+            )
+            for sex, color in sex_colors.items()
+            if sex in summary_data.columns
+        ],
+        layout=SUMMARY_LAYOUT
     )
     
     return fig
 
 def create_empty_figure(message):
     """Create an empty figure with a message"""
-    fig = go.Figure()
-    fig.add_annotation(
-        text=message,
-        xref="paper", yref="paper",
-        x=0.5, y=0.5,
-        showarrow=False,
-        font=dict(size=16)
-    )
-    fig.update_layout(height=400)
-    return fig
\ No newline at end of file
+    fig = go.Figure(layout=dict(
+        annotations=[dict(
+            text=message,
+            xref="paper", yref="paper",
+            x=0.5, y=0.5,
+            showarrow=False,
+            font=dict(size=16)
+        )],
+        height=400
+    ))
+    return fig
+
+# Shared placeholder returned by every chart when the filters match no rows.
+# Built once at import; callers must not mutate it.
+EMPTY_FIGURE = create_empty_figure("No data available for selected filters")
@@ -1,6 +1,13 @@
 import streamlit as st
 import pandas as pd
-from typing import Tuple, List
+import numpy as np
+from typing import Tuple, List, Optional
+
+# Age groups behind each quick select button
+CHILD_AGES = frozenset({'0-4', '5-9', '10-14'})
+YOUTH_AGES = frozenset({'15-19', '20-24', '25-29'})
+ADULT_AGES = frozenset({'30-34', '35-39', '40-44', '45-49'})
+SENIOR_AGES = frozenset({'50-54', '55-59', '60-64', '65-69', '70-74', '75-79', '80+'})
 
 def create_filters(data: pd.DataFrame) -> Tuple[str, List[str], str]:
     """
@@ -47,10 +54,10 @@ def create_filters(data: pd.DataFrame) -> Tuple[str, List[str], str]:
     
     # Group age groups logically
     age_groups = sorted(data['age_group'].unique().tolist())
-    child_ages = [age for age in age_groups if age in ['0-4', '5-9', '10-14']]
-    youth_ages = [age for age in age_groups if age in ['15-19', '20-24', '25-29']]
-    adult_ages = [age for age in age_groups if age in ['30-34', '35-39', '40-44', '45-49']]
-    senior_ages = [age for age in age_groups if age in ['50-54', '55-59', '60-64', '65-69', '70-74', '75-79', '80+']]
+    child_ages = [age for age in age_groups if age in CHILD_AGES]
+    youth_ages = [age for age in age_groups if age in YOUTH_AGES]
+    adult_ages = [age for age in age_groups if age in ADULT_AGES]
+    senior_ages = [age for age in age_groups if age in SENIOR_AGES]
     
     # Quick select buttons
     col1, col2 = st.sidebar.columns(2)
@@ -92,30 +99,23 @@ def create_filters(data: pd.DataFrame) -> Tuple[str, List[str], str]:
     
     st.sidebar.markdown("---")
     
-    # Real-time statistics panel
-    _render_live_statistics(data, selected_country, selected_age_groups, selected_sex)
-    
     return selected_country, selected_age_groups, selected_sex
 
-def _render_live_statistics(data: pd.DataFrame, selected_country: str, 
-                          selected_age_groups: List[str], selected_sex: str) -> None:
-    """Render live statistics panel in sidebar"""
-    st.sidebar.markdown("### 📈 Live Statistics")
+def render_live_statistics(data: pd.DataFrame, filtered_data: pd.DataFrame,
+                           selected_age_groups: List[str], cache_key: Optional[Tuple] = None) -> None:
+    """
+    Render live statistics panel in sidebar
     
-    # Apply filters to data
-    filtered_data = data.copy()
-    if selected_country != "All":
-        filtered_data = filtered_data[filtered_data['country'] == selected_country]
-    if selected_sex != "All":
-        filtered_data = filtered_data[filtered_data['sex'] == selected_sex]
-    if selected_age_groups:
-        filtered_data = filtered_data[filtered_data['age_group'].isin(selected_age_groups)]
+    Takes the frame already filtered by the caller so the selections are
+    not applied a second time here. When a cache_key (such as the filter
+    selection) is given, the statistics are only recomputed when it changes.
+    """
+    st.sidebar.markdown("### 📈 Live Statistics")
     
     # Calculate statistics
-    total_population = filtered_data['population'].sum()
-    male_population = filtered_data[filtered_data['sex'] == 'M']['population'].sum()
-    female_population = filtered_data[filtered_data['sex'] == 'F']['population'].sum()
-    avg_age_population = _calculate_average_population(filtered_data)
+    total_population, male_population, female_population, data_coverage = _get_live_statistics(
+        data, filtered_data, cache_key
+    )
     
     # Display metrics in modern cards
     st.sidebar.markdown(f"""
@@ -127,8 +127,9 @@ def _render_live_statistics(data: pd.DataFrame, selected_country: str,
     
     # Gender distribution
     if total_population > 0:
-        male_percent = (male_population / total_population) * 100
-        female_percent = (female_population / total_population) * 100
+        # Displayed to one decimal place, so single precision is plenty
+        male_percent = np.float32(male_population) / np.float32(total_population) * 100
+        female_percent = np.float32(female_population) / np.float32(total_population) * 100
         
         col1, col2 = st.sidebar.columns(2)
         with col1:
@@ -140,7 +141,6 @@ def _render_live_statistics(data: pd.DataFrame, selected_country: str,
     st.sidebar.metric("📊 Age Groups", len(selected_age_groups))
     
     # Data quality indicator
-    data_coverage = (len(filtered_data) / len(data)) * 100 if len(data) > 0 else 0
     st.sidebar.progress(data_coverage / 100)
     st.sidebar.caption(f"Data coverage: {data_coverage:.1f}%")
     
@@ -153,8 +153,27 @@ def _render_live_statistics(data: pd.DataFrame, selected_country: str,
         else:
             st.sidebar.success("⚖️ Balanced gender distribution")
 
-def _calculate_average_population(data: pd.DataFrame) -> float:
-    """Calculate average population per age group"""
-    if len(data) == 0:
-        return 0
-    return data['population'].mean()
\ No newline at end of file
+def _get_live_statistics(data: pd.DataFrame, filtered_data: pd.DataFrame,
+                         cache_key: Optional[Tuple]) -> Tuple[int, int, int, float]:
+    """
+    Calculate total, male and female population and data coverage.
+    
+    Results are kept in session state under cache_key. Only the computation
+    is skipped on a matching key; the panel is still drawn on every rerun,
+    since Streamlit clears any element a rerun does not emit again.
+    """
+    cached = st.session_state.get('live_statistics')
+    if cache_key is not None and cached is not None and cached[0] == cache_key:
+        return cached[1]
+    
+    sex_totals = filtered_data.groupby('sex', observed=True)['population'].sum()
+    statistics = (
+        sex_totals.sum(),
+        sex_totals.get('M', 0),
+        sex_totals.get('F', 0),
+        (len(filtered_data) / len(data)) * 100 if len(data) > 0 else 0
+    )
+    
+    if cache_key is not None:
+        st.session_state['live_statistics'] = (cache_key, statistics)
+    return statistics
\ No newline at end of file
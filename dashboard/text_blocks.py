@@ -1,24 +1,81 @@
 import pandas as pd
 import streamlit as st
-from typing import Tuple, List, Optional
+import numpy as np
+from typing import NamedTuple, List, Optional
 
-def get_public_health_insights(data: pd.DataFrame, selected_country: str, 
+# Age groups making up each broad age bucket, in age order
+AGE_BUCKETS = {
+    'children': ('0-4', '5-9', '10-14'),
+    'working_age': ('15-19', '20-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50-54', '55-59'),
+    'elderly': ('60-64', '65-69', '70-74', '75-79', '80+')
+}
+AGE_GROUP_DTYPE = pd.CategoricalDtype(
+    [age_group for age_groups in AGE_BUCKETS.values() for age_group in age_groups], ordered=True
+)
+
+# Bucket index for each AGE_GROUP_DTYPE code. The trailing entry is where
+# code -1 (an unrecognised age group) lands, outside the three real buckets.
+AGE_BUCKET_OF_CODE = np.array(
+    [bucket for bucket, age_groups in enumerate(AGE_BUCKETS.values()) for _ in age_groups] + [len(AGE_BUCKETS)],
+    dtype=np.int8
+)
+
+SEX_INDEX = pd.Index(['M', 'F'])
+
+# Age groups that trigger the early childhood recommendations
+EARLY_CHILDHOOD_AGES = frozenset({'0-4', '5-9'})
+
+class DemographicMetrics(NamedTuple):
+    """
+    Population totals and structure indicators for a filtered frame
+    
+    Populations are plain Python numbers: ints for integer counts, floats
+    for fractional WorldPop estimates.
+    """
+    total_population: float
+    child_percentage: float
+    working_percentage: float
+    elderly_percentage: float
+    sex_ratio: float
+    male_population: float
+    female_population: float
+    dependency_ratio: float
+
+# HTML for the quick glance indicators, rendered as one four-column grid
+QUICK_GLANCE_GRID = "<div style='display: grid; grid-template-columns: repeat(4, 1fr); gap: 10px;'>{cards}</div>"
+QUICK_GLANCE_CARD = """
+<div style='text-align: center; padding: 15px; background-color: {color}20; 
+            border-radius: 10px; border-left: 4px solid {color}'>
+    <h3 style='margin:0; color: {color};'>{value}</h3>
+    <p style='margin:0; font-size: 0.8em;'>{label}</p>
+</div>
+"""
+
+def get_public_health_insights(metrics: Optional[DemographicMetrics], selected_country: str, 
                              selected_age_groups: List[str], selected_sex: str) -> None:
-    """Generate modern, visually appealing public health insights"""
+    """
+    Generate modern, visually appealing public health insights
     
-    if data.empty:
+    Args:
+        metrics: Demographic metrics from calculate_demographic_metrics,
+            or None when no data matches the filters
+    """
+    
+    if metrics is None:
         st.error("🚫 No data available for current filters")
         st.info("Try adjusting country, age groups, or sex filters")
         return
     
-    # Calculate metrics
-    metrics = _calculate_demographic_metrics(data)
+    # Nothing to analyse; skip rendering the tabs entirely
+    if metrics.total_population <= 0:
+        st.info("ℹ️ All filters matched zero population")
+        return
     
     # Modern layout with tabs
     tab1, tab2, tab3, tab4 = st.tabs(["📈 Overview", "🎯 Key Insights", "📊 Metrics", "🏥 Recommendations"])
     
     with tab1:
-        _render_population_overview(selected_country, metrics['total_population'])
+        _render_population_overview(selected_country, metrics.total_population)
         _render_quick_glance(metrics)
     
     with tab2:
@@ -30,34 +87,44 @@ def get_public_health_insights(data: pd.DataFrame, selected_country: str,
     with tab4:
         _render_actionable_recommendations(metrics, selected_age_groups)
 
-def _calculate_demographic_metrics(data: pd.DataFrame) -> dict:
-    """Calculate all demographic metrics"""
-    total_population = data['population'].sum()
-    
-    # Age groups
-    child_groups = ['0-4', '5-9', '10-14']
-    working_groups = ['15-19', '20-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50-54', '55-59']
-    elderly_groups = ['60-64', '65-69', '70-74', '75-79', '80+']
-    
-    child_pop = data[data['age_group'].isin(child_groups)]['population'].sum()
-    working_pop = data[data['age_group'].isin(working_groups)]['population'].sum()
-    elderly_pop = data[data['age_group'].isin(elderly_groups)]['population'].sum()
-    
-    male_pop = data[data['sex'] == 'M']['population'].sum()
-    female_pop = data[data['sex'] == 'F']['population'].sum()
-    
-    return {
-        'total_population': total_population,
-        'child_percentage': (child_pop / total_population * 100) if total_population > 0 else 0,
-        'working_percentage': (working_pop / total_population * 100) if total_population > 0 else 0,
-        'elderly_percentage': (elderly_pop / total_population * 100) if total_population > 0 else 0,
-        'sex_ratio': (male_pop / female_pop) if female_pop > 0 else 0,
-        'male_population': male_pop,
-        'female_population': female_pop,
-        'dependency_ratio': ((child_pop + elderly_pop) / working_pop) if working_pop > 0 else 0
-    }
+def calculate_demographic_metrics(data: pd.DataFrame) -> DemographicMetrics:
+    """
+    Calculate all demographic metrics
+    
+    Takes any frame with age_group, sex and population columns, such as the
+    age/sex rollup the dashboard caches per filter selection.
+    """
+    population = data['population'].to_numpy()
+    
+    # Population may be stored in a narrow dtype; accumulate totals in 64 bits
+    accumulator = np.float64 if population.dtype.kind == 'f' else np.int64
+    total_population = population.sum(dtype=accumulator)
+    
+    # Map each row to its age bucket through the category codes and sum every
+    # bucket in a single bincount pass
+    age_codes = AGE_GROUP_DTYPE.categories.get_indexer(data['age_group'])
+    bucket_totals = np.bincount(
+        AGE_BUCKET_OF_CODE[age_codes], weights=population, minlength=len(AGE_BUCKETS) + 1
+    ).astype(accumulator)
+    child_pop, working_pop, elderly_pop = bucket_totals[:len(AGE_BUCKETS)]
+    
+    # Same for sex; codes are shifted so unrecognised values (-1) land in slot 0
+    sex_codes = SEX_INDEX.get_indexer(data['sex'])
+    sex_totals = np.bincount(sex_codes + 1, weights=population, minlength=3).astype(accumulator)
+    male_pop, female_pop = sex_totals[1], sex_totals[2]
+    
+    return DemographicMetrics(
+        total_population=total_population.item(),
+        child_percentage=float(child_pop / total_population * 100) if total_population > 0 else 0.0,
+        working_percentage=float(working_pop / total_population * 100) if total_population > 0 else 0.0,
+        elderly_percentage=float(elderly_pop / total_population * 100) if total_population > 0 else 0.0,
+        sex_ratio=float(male_pop / female_pop) if female_pop > 0 else 0.0,
+        male_population=male_pop.item(),
+        female_population=female_pop.item(),
+        dependency_ratio=float((child_pop + elderly_pop) / working_pop) if working_pop > 0 else 0.0
+    )
 
-def _render_population_overview(selected_country: str, total_population: int) -> None:
+def _render_population_overview(selected_country: str, total_population: float) -> None:
     """Render modern population overview"""
     st.subheader("🌍 Population Overview")
     
@@ -82,88 +149,63 @@ def _render_population_overview(selected_country: str, total_population: int) ->
         st.metric("Density", "Medium", "Urban focus", 
                  help="Population concentration level")
 
-def _render_quick_glance(metrics: dict) -> None:
+def _render_quick_glance(metrics: DemographicMetrics) -> None:
     """Render quick glance indicators"""
     st.subheader("🔍 Quick Glance")
     
-    cols = st.columns(4)
-    
-    # Child population indicator
-    with cols[0]:
-        child_color = "#FF6B6B" if metrics['child_percentage'] > 35 else "#4ECDC4"
-        st.markdown(f"""
-        <div style='text-align: center; padding: 15px; background-color: {child_color}20; 
-                    border-radius: 10px; border-left: 4px solid {child_color}'>
-            <h3 style='margin:0; color: {child_color};'>{metrics['child_percentage']:.1f}%</h3>
-            <p style='margin:0; font-size: 0.8em;'>Children (0-14)</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    # Workforce indicator
-    with cols[1]:
-        work_color = "#45B7D1" if metrics['working_percentage'] > 60 else "#F7B731"
-        st.markdown(f"""
-        <div style='text-align: center; padding: 15px; background-color: {work_color}20; 
-                    border-radius: 10px; border-left: 4px solid {work_color}'>
-            <h3 style='margin:0; color: {work_color};'>{metrics['working_percentage']:.1f}%</h3>
-            <p style='margin:0; font-size: 0.8em;'>Workforce (15-59)</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    # Elderly indicator
-    with cols[2]:
-        elder_color = "#9966CC" if metrics['elderly_percentage'] > 10 else "#A0A0A0"
-        st.markdown(f"""
-        <div style='text-align: center; padding: 15px; background-color: {elder_color}20; 
-                    border-radius: 10px; border-left: 4px solid {elder_color}'>
-            <h3 style='margin:0; color: {elder_color};'>{metrics['elderly_percentage']:.1f}%</h3>
-            <p style='margin:0; font-size: 0.8em;'>Elderly (60+)</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    # Sex ratio indicator
-    with cols[3]:
-        ratio_color = "#4CAF50" if 0.95 <= metrics['sex_ratio'] <= 1.05 else "#FF9800"
-        st.markdown(f"""
-        <div style='text-align: center; padding: 15px; background-color: {ratio_color}20; 
-                    border-radius: 10px; border-left: 4px solid {ratio_color}'>
-            <h3 style='margin:0; color: {ratio_color};'>{metrics['sex_ratio']:.2f}</h3>
-            <p style='margin:0; font-size: 0.8em;'>Sex Ratio</p>
-        </div>
-        """, unsafe_allow_html=True)
+    # (color, value, label) for each indicator card
+    child_color = "#FF6B6B" if metrics.child_percentage > 35 else "#4ECDC4"
+    work_color = "#45B7D1" if metrics.working_percentage > 60 else "#F7B731"
+    elder_color = "#9966CC" if metrics.elderly_percentage > 10 else "#A0A0A0"
+    ratio_color = "#4CAF50" if 0.95 <= metrics.sex_ratio <= 1.05 else "#FF9800"
+    cards = [
+        (child_color, f"{metrics.child_percentage:.1f}%", "Children (0-14)"),
+        (work_color, f"{metrics.working_percentage:.1f}%", "Workforce (15-59)"),
+        (elder_color, f"{metrics.elderly_percentage:.1f}%", "Elderly (60+)"),
+        (ratio_color, f"{metrics.sex_ratio:.2f}", "Sex Ratio")
+    ]
+    
+    # All four cards go out as a single element rather than one per column
+    st.markdown(
+        QUICK_GLANCE_GRID.format(
+            cards=''.join(QUICK_GLANCE_CARD.format(color=color, value=value, label=label)
+                          for color, value, label in cards)
+        ),
+        unsafe_allow_html=True
+    )
 
-def _render_key_insights(metrics: dict, selected_age_groups: List[str]) -> None:
+def _render_key_insights(metrics: DemographicMetrics, selected_age_groups: List[str]) -> None:
     """Render key insights with modern cards"""
     st.subheader("💡 Key Insights")
     
     insights = []
     
     # Population structure insights
-    if metrics['child_percentage'] > 35:
+    if metrics.child_percentage > 35:
         insights.append(("👶 Youthful Population", 
                         "High youth dependency ratio indicates need for education and child healthcare expansion", 
                         "success"))
-    elif metrics['elderly_percentage'] > 12:
+    elif metrics.elderly_percentage > 12:
         insights.append(("👵 Aging Society", 
                         "Growing elderly population requires geriatric care and social security systems", 
                         "info"))
     
     # Workforce insights
-    if metrics['working_percentage'] > 65:
+    if metrics.working_percentage > 65:
         insights.append(("💼 Demographic Dividend", 
                         "Large working-age population presents economic growth opportunity", 
                         "success"))
-    elif metrics['dependency_ratio'] > 0.7:
+    elif metrics.dependency_ratio > 0.7:
         insights.append(("⚖️ High Dependency", 
                         "High dependency ratio may strain social services and economic growth", 
                         "warning"))
     
     # Gender insights
-    if metrics['sex_ratio'] > 1.1:
+    if metrics.sex_ratio > 1.1:
         insights.append(("🚹 Gender Imbalance", 
                         "Male-skewed population may indicate migration patterns or social factors", 
                         "warning"))
-    elif metrics['sex_ratio'] < 0.9:
+    elif metrics.sex_ratio < 0.9:
         insights.append(("🚺 Female Majority", 
                         "Female-majority population may reflect specific regional characteristics", 
                         "info"))
@@ -177,66 +219,45 @@ def _render_key_insights(metrics: dict, selected_age_groups: List[str]) -> None:
         elif type == "info":
             st.info(f"**{title}**\n\n{description}")
 
-def _render_detailed_metrics(metrics: dict) -> None:
-    """Render detailed metrics with progress bars"""
+def _render_detailed_metrics(metrics: DemographicMetrics) -> None:
+    """Render detailed metrics as a single table with share bars"""
     st.subheader("📊 Detailed Analysis")
     
-    # Age structure progress bars
-    st.write("**Age Structure Distribution**")
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.write("Children (0-14)")
-        st.progress(metrics['child_percentage'] / 100)
-        st.caption(f"{metrics['child_percentage']:.1f}%")
-    
-    with col2:
-        st.write("Working Age (15-59)")
-        st.progress(metrics['working_percentage'] / 100)
-        st.caption(f"{metrics['working_percentage']:.1f}%")
-    
-    with col3:
-        st.write("Elderly (60+)")
-        st.progress(metrics['elderly_percentage'] / 100)
-        st.caption(f"{metrics['elderly_percentage']:.1f}%")
-    
-    # Sex distribution
-    st.write("**Gender Distribution**")
-    sex_col1, sex_col2 = st.columns(2)
-    
-    with sex_col1:
-        male_percent = (metrics['male_population'] / metrics['total_population'] * 100)
-        st.metric("Male Population", f"{male_percent:.1f}%", 
-                 f"{metrics['male_population']:,} people")
-    
-    with sex_col2:
-        female_percent = (metrics['female_population'] / metrics['total_population'] * 100)
-        st.metric("Female Population", f"{female_percent:.1f}%", 
-                 f"{metrics['female_population']:,} people")
-    
-    # Dependency ratio
-    st.write("**Dependency Analysis**")
-    dep_col1, dep_col2, dep_col3 = st.columns(3)
-    
-    with dep_col1:
-        st.metric("Dependency Ratio", f"{metrics['dependency_ratio']:.2f}",
-                 "Dependents per worker")
-    
-    with dep_col2:
-        st.metric("Youth Dependency", f"{(metrics['child_percentage'] / metrics['working_percentage']):.2f}",
-                 "Children per worker")
-    
-    with dep_col3:
-        st.metric("Elderly Dependency", f"{(metrics['elderly_percentage'] / metrics['working_percentage']):.2f}",
-                 "Elderly per worker")
+    total_population = metrics.total_population
+    male_share = metrics.male_population / total_population
+    female_share = metrics.female_population / total_population
+    youth_dependency = metrics.child_percentage / metrics.working_percentage
+    elderly_dependency = metrics.elderly_percentage / metrics.working_percentage
+    
+    # One row per indicator; Share drives the bars and is blank for ratios
+    detail_table = pd.DataFrame(
+        [
+            ("Children (0-14)", f"{metrics.child_percentage:.1f}%", metrics.child_percentage / 100, "Age structure"),
+            ("Working Age (15-59)", f"{metrics.working_percentage:.1f}%", metrics.working_percentage / 100, "Age structure"),
+            ("Elderly (60+)", f"{metrics.elderly_percentage:.1f}%", metrics.elderly_percentage / 100, "Age structure"),
+            ("Male Population", f"{male_share * 100:.1f}%", male_share, f"{metrics.male_population:,} people"),
+            ("Female Population", f"{female_share * 100:.1f}%", female_share, f"{metrics.female_population:,} people"),
+            ("Dependency Ratio", f"{metrics.dependency_ratio:.2f}", None, "Dependents per worker"),
+            ("Youth Dependency", f"{youth_dependency:.2f}", None, "Children per worker"),
+            ("Elderly Dependency", f"{elderly_dependency:.2f}", None, "Elderly per worker")
+        ],
+        columns=['Indicator', 'Value', 'Share', 'Detail']
+    )
+    
+    st.dataframe(
+        detail_table.style
+        .format({'Share': '{:.1%}'}, na_rep='')
+        .bar(subset=['Share'], color='#4ECDC4', vmin=0, vmax=1),
+        hide_index=True,
+        use_container_width=True
+    )
 
-def _render_actionable_recommendations(metrics: dict, selected_age_groups: List[str]) -> None:
+def _render_actionable_recommendations(metrics: DemographicMetrics, selected_age_groups: List[str]) -> None:
     """Render actionable recommendations"""
     st.subheader("🎯 Actionable Recommendations")
     
     # Priority recommendations based on population structure
-    if metrics['child_percentage'] > 30:
+    if metrics.child_percentage > 30:
         with st.expander("🎓 **HIGH PRIORITY**: Education & Child Services", expanded=True):
             st.write("""
             **Immediate Actions:**
@@ -250,7 +271,7 @@ def _render_actionable_recommendations(metrics: dict, selected_age_groups: List[
             • Develop adolescent health clinics
             """)
     
-    if metrics['working_percentage'] > 60:
+    if metrics.working_percentage > 60:
         with st.expander("💼 **MEDIUM PRIORITY**: Economic Development"):
             st.write("""
             **Workforce Development:**
@@ -264,7 +285,7 @@ def _render_actionable_recommendations(metrics: dict, selected_age_groups: List[
             • Promote entrepreneurship among youth
             """)
     
-    if metrics['elderly_percentage'] > 8:
+    if metrics.elderly_percentage > 8:
         with st.expander("🏥 **MEDIUM PRIORITY**: Elderly Care"):
             st.write("""
             **Healthcare Services:**
@@ -293,7 +314,7 @@ def _render_actionable_recommendations(metrics: dict, selected_age_groups: List[
         """)
     
     # Specialized programs based on selected age groups
-    if selected_age_groups and any(age in ['0-4', '5-9'] for age in selected_age_groups):
+    if selected_age_groups and not EARLY_CHILDHOOD_AGES.isdisjoint(selected_age_groups):
         with st.expander("👶 **SPECIALIZED**: Early Childhood Focus"):
             st.write("""
             **Early Intervention:**
@@ -8,7 +8,11 @@ for Kenya and Uganda, with district-level summarization and dashboard integratio
 __version__ = "1.0.0"
 __author__ = "WorldPop Dashboard Team"
 
-from .config import *
+from .config import (
+    BASE_DIR, DATA_DIR, GADM_DIR, OUTPUT_DIR, CACHE_DIR, POPULATION_TABLE,
+    WORLDPOP_BASE_URL, COUNTRIES, AGE_GROUPS, SEX_OPTIONS, GADM_FILES,
+    CACHE_MAX_AGE, GDAL_ENV, VSICURL_ENV, ensure_dirs
+)
 from .load_rasters import RasterLoader
 from .extract_metadata import *
 from .summarize_by_district import DistrictSummarizer
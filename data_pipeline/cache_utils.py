@@ -1,17 +1,83 @@
+import functools
 import hashlib
+import os
+import shutil
 import time
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 from .config import CACHE_MAX_AGE
 
 logger = logging.getLogger(__name__)
 
+# Subdirectory of the cache holding decoded bands. Each array file name
+# starts with the cache key of the GeoTIFF it was decoded from.
+ARRAY_CACHE_DIRNAME = "arrays"
+
+def create_session(pool_size=16, retries=3):
+    """
+    Create an HTTP session with a connection pool and retries
+    
+    Args:
+        pool_size: Number of pooled connections per host
+        retries: Number of retries for failed requests
+        
+    Returns:
+        requests.Session: Configured session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=0.5)
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+# Shared session so consecutive downloads reuse open connections
+_SESSION = create_session()
+
+@functools.lru_cache(maxsize=4096)
 def generate_cache_key(url):
-    """Generate cache key from URL"""
+    """
+    Generate cache key from URL
+    
+    Keys are memoized, since the same URLs are looked up and downloaded
+    repeatedly during batch loads. url must be a str.
+    """
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=16).hexdigest()
+
+def _legacy_cache_key(url):
+    """Cache key used before the switch to BLAKE2b"""
     return hashlib.md5(url.encode()).hexdigest()
 
+def _migrate_legacy_entry(url, cache_dir, cache_key):
+    """Rename a cache entry stored under the legacy MD5 key to the current key"""
+    legacy_key = _legacy_cache_key(url)
+    legacy_file = cache_dir / f"{legacy_key}.tif"
+    if not legacy_file.exists():
+        return
+    
+    # Older versions wrote the sidecar only after a download completed, so a
+    # legacy file without one may be truncated and is discarded
+    if not (cache_dir / f"{legacy_key}.json").exists():
+        legacy_file.unlink()
+        return
+    
+    # os.replace keeps the mtime, so the entry's age carries over
+    os.replace(legacy_file, cache_dir / f"{cache_key}.tif")
+    _remove_metadata_sidecar(cache_dir, legacy_key)
+
+def _remove_metadata_sidecar(cache_dir, cache_key):
+    """Remove the JSON sidecar older versions wrote next to each cached file"""
+    metadata_file = cache_dir / f"{cache_key}.json"
+    if metadata_file.exists():
+        metadata_file.unlink()
+
 def get_cached_file(url, cache_dir, max_age=CACHE_MAX_AGE):
     """
     Get cached file if it exists and is not expired
@@ -26,59 +92,62 @@ def get_cached_file(url, cache_dir, max_age=CACHE_MAX_AGE):
     """
     cache_key = generate_cache_key(url)
     cache_file = cache_dir / f"{cache_key}.tif"
-    metadata_file = cache_dir / f"{cache_key}.json"
     
-    if cache_file.exists() and metadata_file.exists():
-        try:
-            with open(metadata_file, 'r') as f:
-                metadata = json.load(f)
-            
-            # Check if cache is still valid
-            if time.time() - metadata['timestamp'] < max_age:
-                logger.debug(f"Using cached file: {cache_file}")
-                return cache_file
-            else:
-                logger.debug(f"Cache expired for: {url}")
-        except Exception as e:
-            logger.warning(f"Error reading cache metadata: {str(e)}")
+    # Entries cached before the key change are picked up and renamed
+    if not cache_file.exists():
+        _migrate_legacy_entry(url, cache_dir, cache_key)
+    
+    # The file's modification time records when it was downloaded
+    try:
+        age = time.time() - cache_file.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    
+    if age < max_age:
+        logger.debug(f"Using cached file: {cache_file}")
+        return cache_file
     
+    logger.debug(f"Cache expired for: {url}")
     return None
 
-def download_file(url, cache_dir, chunk_size=8192):
+def download_file(url, cache_dir, chunk_size=1 << 20, session=None):
     """
     Download file and cache it
     
+    The file is streamed to a temporary .part file and only moved into place
+    once complete, so an interrupted download never leaves a truncated raster
+    in the cache.
+    
     Args:
         url: File URL
         cache_dir: Cache directory
-        chunk_size: Download chunk size
+        chunk_size: Size of each block copied from the response stream
+        session: requests.Session to download with (defaults to the shared session)
         
     Returns:
         Path: Path to downloaded file
     """
+    session = session or _SESSION
     cache_key = generate_cache_key(url)
     cache_file = cache_dir / f"{cache_key}.tif"
-    metadata_file = cache_dir / f"{cache_key}.json"
+    part_file = cache_dir / f"{cache_key}.tif.part"
     
     try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
         logger.info(f"Downloading: {url}")
-        response = requests.get(url, stream=True)
+        response = session.get(url, stream=True)
         response.raise_for_status()
         
-        # Download file
-        with open(cache_file, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=chunk_size):
-                f.write(chunk)
-        
-        # Save metadata
-        metadata = {
-            'url': url,
-            'timestamp': time.time(),
-            'size': cache_file.stat().st_size
-        }
+        # Copy the raw stream straight to disk; copyfileobj loops in large
+        # blocks, and decode_content still undoes any transfer encoding
+        response.raw.decode_content = True
+        with open(part_file, 'wb') as f:
+            shutil.copyfileobj(response.raw, f, length=chunk_size)
+        os.replace(part_file, cache_file)
         
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata, f)
+        # Stamp the download time; get_cached_file ages entries by mtime
+        os.utime(cache_file, None)
+        _remove_metadata_sidecar(cache_dir, cache_key)
         
         logger.info(f"Downloaded and cached: {cache_file}")
         return cache_file
@@ -86,43 +155,134 @@ def download_file(url, cache_dir, chunk_size=8192):
     except Exception as e:
         logger.error(f"Failed to download {url}: {str(e)}")
         # Clean up partial download
-        if cache_file.exists():
-            cache_file.unlink()
+        for partial in (part_file, cache_file):
+            if partial.exists():
+                partial.unlink()
         raise
 
+def download_many(urls, cache_dir, max_workers=8, session=None):
+    """
+    Download several files concurrently, reusing valid cached copies
+    
+    Args:
+        urls: Iterable of file URLs
+        cache_dir: Cache directory
+        max_workers: Number of parallel downloads
+        session: requests.Session shared by all downloads (defaults to the shared session)
+        
+    Returns:
+        dict: URL -> Path of the cached file, or None if the download failed
+    """
+    session = session or _SESSION
+    results = {}
+    pending = []
+    
+    for url in urls:
+        cached_file = get_cached_file(url, cache_dir)
+        if cached_file:
+            results[url] = cached_file
+        else:
+            pending.append(url)
+    
+    if not pending:
+        return results
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(download_file, url, cache_dir, session=session): url
+            for url in pending
+        }
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                results[url] = future.result()
+            except Exception:
+                # download_file already logged the failure
+                results[url] = None
+    
+    return results
+
 def clear_old_cache(cache_dir, max_age=CACHE_MAX_AGE):
     """
     Clear expired cache files
     
+    Decoded arrays are removed together with the GeoTIFF they came from;
+    arrays whose GeoTIFF is gone are removed as well, and so are partial
+    downloads and array files left by interrupted writes.
+    
     Args:
         cache_dir: Cache directory
         max_age: Maximum cache age in seconds
     """
     current_time = time.time()
     cleared_count = 0
+    live_keys = set()
+    sidecars = []
     
-    for cache_file in cache_dir.glob("*.tif"):
-        metadata_file = cache_dir / f"{cache_file.stem}.json"
-        
-        if metadata_file.exists():
+    # scandir entries carry cached stat info, so each file costs one stat at most
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
             try:
-                with open(metadata_file, 'r') as f:
-                    metadata = json.load(f)
-                
-                if current_time - metadata['timestamp'] > max_age:
-                    cache_file.unlink()
-                    metadata_file.unlink()
-                    cleared_count += 1
+                if entry.name.endswith('.json'):
+                    sidecars.append(entry)
+                elif entry.name.endswith('.tif'):
+                    if current_time - entry.stat().st_mtime > max_age:
+                        os.unlink(entry.path)
+                        cleared_count += 1
+                    else:
+                        live_keys.add(entry.name[:-len('.tif')])
+                elif entry.name.endswith('.tif.part'):
+                    # Left behind by a killed download; one still in progress
+                    # is being written to and so is recent
+                    if current_time - entry.stat().st_mtime > max_age:
+                        os.unlink(entry.path)
+                        cleared_count += 1
                     
             except Exception as e:
-                logger.warning(f"Error processing cache file {cache_file}: {str(e)}")
+                logger.warning(f"Error processing cache file {entry.path}: {str(e)}")
+    
+    # JSON sidecars from the old cache layout are no longer read, but a legacy
+    # file still needs its sidecar to be migrated by get_cached_file, so only
+    # sidecars whose raster is gone are dropped
+    for entry in sidecars:
+        if entry.name[:-len('.json')] not in live_keys:
+            try:
+                os.unlink(entry.path)
+            except Exception as e:
+                logger.warning(f"Error processing cache file {entry.path}: {str(e)}")
+    
+    array_dir = Path(cache_dir) / ARRAY_CACHE_DIRNAME
+    if array_dir.is_dir():
+        with os.scandir(array_dir) as entries:
+            for entry in entries:
+                # Array names are '{cache_key}.npy' or '{cache_key}_{window}.npy'
+                cache_key = entry.name.split('.')[0].split('_')[0]
+                try:
+                    if entry.name.endswith('.npy'):
+                        expired = cache_key not in live_keys
+                    elif entry.name.endswith('.npy.part'):
+                        # Left behind by an interrupted write; one still being
+                        # written is recent and belongs to a live GeoTIFF
+                        expired = (cache_key not in live_keys
+                                   or current_time - entry.stat().st_mtime > max_age)
+                    else:
+                        continue
+                    
+                    if expired:
+                        os.unlink(entry.path)
+                        cleared_count += 1
+                except Exception as e:
+                    logger.warning(f"Error processing cache file {entry.path}: {str(e)}")
     
     logger.info(f"Cleared {cleared_count} expired cache files")
 
 def get_cache_size(cache_dir):
-    """Get total size of cache directory"""
-    total_size = 0
-    for file_path in cache_dir.glob("*"):
-        if file_path.is_file():
-            total_size += file_path.stat().st_size
-    return total_size
\ No newline at end of file
+    """Get total size of cache directory, including decoded arrays"""
+    total = 0
+    for directory in (Path(cache_dir), Path(cache_dir) / ARRAY_CACHE_DIRNAME):
+        if not directory.is_dir():
+            continue
+        with os.scandir(directory) as entries:
+            total += sum(entry.stat(follow_symlinks=False).st_size for entry in entries
+                         if entry.is_file(follow_symlinks=False))
+    return total
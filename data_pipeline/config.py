@@ -29,10 +29,35 @@ GADM_FILES = {
     "UGA": GADM_DIR / "gadm41_UGA_2.json"
 }
 
+# Long-format district x age group x sex population table written by the
+# pipeline, stored as Parquet so readers can load only the rows and columns
+# they filter on
+POPULATION_TABLE = OUTPUT_DIR / "population.parquet"
+
+# GDAL settings applied while reading rasters: decode compressed blocks on
+# all cores and give GDAL a larger block cache (MB). Batch loads override the
+# thread count so concurrent reads share the cores
+GDAL_ENV = {
+    "GDAL_NUM_THREADS": "ALL_CPUS",
+    "GDAL_CACHEMAX": 512
+}
+
+# Extra GDAL settings for streaming rasters over HTTP with /vsicurl/: only
+# the blocks actually read are fetched, using range requests over a
+# multiplexed connection with a 100 MB in-memory block cache
+VSICURL_ENV = {
+    "GDAL_HTTP_MULTIPLEX": True,
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif",
+    "VSI_CACHE": True,
+    "VSI_CACHE_SIZE": 100_000_000
+}
+
 # Cache configuration
 CACHE_DIR = BASE_DIR / "cache"
 CACHE_MAX_AGE = 24 * 60 * 60  # 24 hours in seconds
 
-# Create necessary directories
-for directory in [OUTPUT_DIR, CACHE_DIR, GADM_DIR]:
-    directory.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+def ensure_dirs():
+    """Create the output, cache and boundary directories if they do not exist"""
+    for directory in (OUTPUT_DIR, CACHE_DIR, GADM_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
@@ -5,6 +5,17 @@ from .config import COUNTRIES, AGE_GROUPS, SEX_OPTIONS
 
 logger = logging.getLogger(__name__)
 
+# Patterns are compiled once at import rather than on every call
+# WorldPop age/sex files, e.g. 'M_0_4.tif' or 'F_80_plus.tif'
+_FILENAME_RE = re.compile(r'^([MF])_(\d+)_(\d+|[a-z_]+)\.tif$')
+# Any configured country code as a path segment of the URL
+_COUNTRY_RE = re.compile('/(' + '|'.join(map(re.escape, COUNTRIES)) + ')/')
+
+# Lookup sets for validate_metadata
+_REQUIRED_FIELDS = frozenset(('sex', 'age_group', 'age_start'))
+_VALID_SEXES = frozenset(SEX_OPTIONS)
+_VALID_AGE_GROUPS = frozenset(AGE_GROUPS)
+
 def parse_filename(filename):
     """
     Parse WorldPop filename to extract metadata
@@ -18,9 +29,7 @@ def parse_filename(filename):
     # Extract just the filename from path/URL
     basename = Path(filename).name
     
-    # Pattern for WorldPop age/sex files
-    pattern = r'^([MF])_(\d+)_(\d+|[a-z_]+)\.tif$'
-    match = re.match(pattern, basename)
+    match = _FILENAME_RE.match(basename)
     
     if not match:
         logger.warning(f"Invalid filename format: {basename}")
@@ -54,8 +63,7 @@ def extract_country_from_url(url):
     Returns:
         str: Country code or None
     """
-    country_pattern = r'/(KEN|UGA)/'
-    match = re.search(country_pattern, url.upper())
+    match = _COUNTRY_RE.search(url.upper())
     
     if match:
         return match.group(1)
@@ -76,32 +84,32 @@ def validate_metadata(metadata):
     if not metadata:
         return False
         
-    required_fields = ['sex', 'age_group', 'age_start']
-    for field in required_fields:
-        if field not in metadata:
-            return False
+    if not _REQUIRED_FIELDS.issubset(metadata):
+        return False
     
-    if metadata['sex'] not in SEX_OPTIONS:
+    if metadata['sex'] not in _VALID_SEXES:
         return False
         
     # Validate age group format
     age_group = metadata['age_group']
-    if age_group not in AGE_GROUPS and not any(ag in age_group for ag in AGE_GROUPS):
+    if age_group not in _VALID_AGE_GROUPS and not any(ag in age_group for ag in AGE_GROUPS):
         logger.warning(f"Unrecognized age group: {age_group}")
         return False
     
     return True
 
-def create_metadata_summary(raster_data):
+def collect_raster_metadata(raster_data):
     """
-    Create summary of raster metadata
+    Build the metadata summary and per-raster metadata table in one pass
     
     Args:
         raster_data: Dictionary from batch_load_rasters
         
     Returns:
-        dict: Summary statistics
+        tuple: (summary dict, DataFrame with one row per raster)
     """
+    import pandas as pd
+    
     summary = {
         'total_rasters': 0,
         'countries': set(),
@@ -109,30 +117,68 @@ def create_metadata_summary(raster_data):
         'failed_rasters': [],
         'spatial_info': {}
     }
+    records = []
     
     for country, country_data in raster_data.items():
         summary['countries'].add(country)
         
         for sex, sex_data in country_data.items():
             for age_group, raster_info in sex_data.items():
-                if raster_info.get('data') is not None:
+                data = raster_info.get('data')
+                profile = raster_info.get('profile', {})
+                bounds = raster_info.get('bounds')
+                
+                if data is not None:
                     summary['total_rasters'] += 1
                     summary['age_groups'].add(age_group)
                     
                     # Store spatial info from first successful raster
                     if country not in summary['spatial_info']:
                         summary['spatial_info'][country] = {
-                            'crs': raster_info.get('profile', {}).get('crs'),
-                            'bounds': raster_info.get('bounds'),
-                            'shape': raster_info.get('data', {}).shape if hasattr(raster_info.get('data'), 'shape') else None
+                            'crs': profile.get('crs'),
+                            'bounds': bounds,
+                            'shape': data.shape if hasattr(data, 'shape') else None
                         }
                 else:
                     summary['failed_rasters'].append(f"{country}_{sex}_{age_group}")
+                
+                record = {
+                    'country': country,
+                    'sex': sex,
+                    'age_group': age_group,
+                    'data_loaded': data is not None,
+                    'crs': str(profile.get('crs', '')),
+                    'width': profile.get('width', 0),
+                    'height': profile.get('height', 0)
+                }
+                
+                if bounds:
+                    record.update({
+                        'left': bounds.left,
+                        'bottom': bounds.bottom,
+                        'right': bounds.right,
+                        'top': bounds.top
+                    })
+                
+                records.append(record)
     
     # Convert sets to lists for JSON serialization
     summary['countries'] = list(summary['countries'])
     summary['age_groups'] = list(summary['age_groups'])
     
+    return summary, pd.DataFrame(records)
+
+def create_metadata_summary(raster_data):
+    """
+    Create summary of raster metadata
+    
+    Args:
+        raster_data: Dictionary from batch_load_rasters
+        
+    Returns:
+        dict: Summary statistics
+    """
+    summary, _ = collect_raster_metadata(raster_data)
     return summary
 
 def export_metadata_to_csv(raster_data, output_path):
@@ -143,33 +189,6 @@ def export_metadata_to_csv(raster_data, output_path):
         raster_data: Dictionary from batch_load_rasters
         output_path: Path for output CSV
     """
-    import pandas as pd
-    
-    records = []
-    
-    for country, country_data in raster_data.items():
-        for sex, sex_data in country_data.items():
-            for age_group, raster_info in sex_data.items():
-                record = {
-                    'country': country,
-                    'sex': sex,
-                    'age_group': age_group,
-                    'data_loaded': raster_info.get('data') is not None,
-                    'crs': str(raster_info.get('profile', {}).get('crs', '')),
-                    'width': raster_info.get('profile', {}).get('width', 0),
-                    'height': raster_info.get('profile', {}).get('height', 0)
-                }
-                
-                if raster_info.get('bounds'):
-                    record.update({
-                        'left': raster_info['bounds'].left,
-                        'bottom': raster_info['bounds'].bottom,
-                        'right': raster_info['bounds'].right,
-                        'top': raster_info['bounds'].top
-                    })
-                
-                records.append(record)
-    
-    df = pd.DataFrame(records)
-    df.to_csv(output_path, index=False)
-    logger.info(f"Metadata exported to {output_path}")
\ No newline at end of file
+    _, metadata_table = collect_raster_metadata(raster_data)
+    metadata_table.to_csv(output_path, index=False)
+    logger.info(f"Metadata exported to {output_path}")
@@ -1,17 +1,147 @@
 import rasterio
+from rasterio.coords import BoundingBox
+from rasterio.warp import transform_bounds
+from rasterio.errors import WindowError
+from rasterio.windows import Window, bounds as window_bounds
 import numpy as np
 import requests
 from pathlib import Path
 import tempfile
+import os
+import atexit
+import shutil
 import logging
-from .config import WORLDPOP_BASE_URL, COUNTRIES, AGE_GROUPS, SEX_OPTIONS
-from .utils import download_file, get_cached_file
+from concurrent.futures import ThreadPoolExecutor
+from .config import WORLDPOP_BASE_URL, COUNTRIES, AGE_GROUPS, SEX_OPTIONS, GDAL_ENV, VSICURL_ENV
+from .utils import download_file, download_many, get_cached_file, pixel_window, ARRAY_CACHE_DIRNAME
 
 logger = logging.getLogger(__name__)
 
+_temp_download_dir = None
+
+def _get_temp_download_dir():
+    """Directory for uncached downloads, created on first use and removed at exit"""
+    global _temp_download_dir
+    if _temp_download_dir is None:
+        _temp_download_dir = Path(tempfile.mkdtemp(prefix='worldpop_'))
+        atexit.register(shutil.rmtree, _temp_download_dir, ignore_errors=True)
+    return _temp_download_dir
+
+class RasterBlocks:
+    """
+    A raster band read lazily, one block at a time
+    
+    Stands in for the band array when rasters are loaded blockwise. Each
+    iteration reopens the file and reads the band's blocks in turn, so at
+    most one block is held in memory instead of the whole band.
+    """
+    
+    def __init__(self, file_path, window, env):
+        """
+        Args:
+            file_path: Raster file, or a /vsicurl/ URL when streaming
+            window: Window of the file's grid covered by this band
+            env: Callable returning the rasterio environment to read in
+        """
+        self.file_path = file_path
+        self.window = window
+        self.shape = (window.height, window.width)
+        self._env = env
+    
+    def __iter__(self):
+        """
+        Yields:
+            tuple: (window, data array) for each block overlapping the band,
+                with the window relative to the band's own grid
+        """
+        with self._env(), rasterio.open(self.file_path) as src:
+            for _, block_window in src.block_windows(1):
+                try:
+                    part = block_window.intersection(self.window)
+                except WindowError:
+                    continue
+                yield (
+                    Window(part.col_off - self.window.col_off, part.row_off - self.window.row_off,
+                           part.width, part.height),
+                    src.read(1, window=part)
+                )
+
 class RasterLoader:
-    def __init__(self, cache_dir=None):
+    def __init__(self, cache_dir=None, stream=False):
+        """
+        Args:
+            cache_dir: Directory for downloaded rasters, or None to download
+                to a temporary location
+            stream: Read rasters straight from WorldPop over HTTP range
+                requests instead of downloading whole files
+        """
         self.cache_dir = cache_dir
+        self.stream = stream
+        # Uncached downloads by URL, so each file is fetched once per loader
+        self._url_to_path = {}
+    
+    def _ensure_local(self, url, use_cache=True):
+        """
+        Local copy of a raster, downloading it if needed
+        
+        Uses the cache directory when caching is enabled; otherwise the file
+        is downloaded once into a temporary directory that is removed when
+        the process exits.
+        
+        Args:
+            url: Raster URL
+            use_cache: Whether to use the cache directory
+            
+        Returns:
+            Path: Local raster file
+        """
+        if use_cache and self.cache_dir:
+            return get_cached_file(url, self.cache_dir) or download_file(url, self.cache_dir)
+        
+        if url not in self._url_to_path:
+            self._url_to_path[url] = download_file(url, _get_temp_download_dir())
+        return self._url_to_path[url]
+    
+    def _array_cache_path(self, file_path, window=None):
+        """
+        Path of the decoded band, or of a window of it, cached for a raster
+        
+        Arrays are named after the cached GeoTIFF's key so clear_old_cache
+        can expire them together with it.
+        """
+        name = Path(file_path).stem
+        if window is not None:
+            name += f"_{window.col_off}_{window.row_off}_{window.width}_{window.height}"
+        return Path(self.cache_dir) / ARRAY_CACHE_DIRNAME / f"{name}.npy"
+    
+    def _cache_array(self, data, array_path):
+        """
+        Write a decoded band to the array cache and map it back from disk
+        
+        Returns:
+            np.memmap: Read-only view of the cached band
+        """
+        array_path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = array_path.with_suffix('.npy.part')
+        with open(part_path, 'wb') as f:
+            np.save(f, data)
+        os.replace(part_path, array_path)
+        return np.load(array_path, mmap_mode='r')
+    
+    def _gdal_env(self, num_threads=None):
+        """
+        rasterio environment for reading, with HTTP settings when streaming
+        
+        Args:
+            num_threads: Number of GDAL decoding threads, or None to use the
+                GDAL_ENV setting (all CPUs)
+        """
+        env = dict(GDAL_ENV)
+        if num_threads is not None:
+            env['GDAL_NUM_THREADS'] = num_threads
+        if self.stream:
+            env.update(VSICURL_ENV)
+        return rasterio.Env(**env)
         
     def get_raster_url(self, country, sex, age_group):
         """Construct the URL for a specific raster file"""
@@ -19,15 +149,27 @@ class RasterLoader:
         url = f"{WORLDPOP_BASE_URL}/{country}/v1.0/{filename}"
         return url
     
-    def load_raster(self, country, sex, age_group, use_cache=True):
+    def load_raster(self, country, sex, age_group, use_cache=True, clip_bounds=None, gdal_threads=None,
+                    blockwise=False):
         """
         Load raster data from WorldPop URL or cache
         
+        With a cache directory the decoded band is also kept there as a .npy
+        file and returned memory-mapped, so loaded rasters are paged in from
+        disk on demand instead of all staying resident. With blockwise, the
+        band is not read here at all; a RasterBlocks is returned in its place
+        and the blocks are read when it is iterated.
+        
         Args:
             country: Country code (KEN, UGA)
             sex: Sex (M, F)
             age_group: Age group string
             use_cache: Whether to use cached files
+            clip_bounds: Optional (bounds, crs) pair; only the pixel window
+                covering these bounds is read, and the returned profile and
+                bounds describe that window
+            gdal_threads: Number of GDAL decoding threads, or None for all CPUs
+            blockwise: Whether to return a RasterBlocks instead of the array
             
         Returns:
             tuple: (data array, profile dict) or (None, None) if failed
@@ -35,24 +177,51 @@ class RasterLoader:
         url = self.get_raster_url(country, sex, age_group)
         
         try:
-            if use_cache and self.cache_dir:
-                cached_file = get_cached_file(url, self.cache_dir)
-                if cached_file:
-                    file_path = cached_file
-                else:
-                    file_path = download_file(url, self.cache_dir)
+            if self.stream:
+                file_path = f"/vsicurl/{url}"
             else:
-                # Download to temporary file
-                with tempfile.NamedTemporaryFile(suffix='.tif', delete=False) as tmp_file:
-                    file_path = download_file(url, Path(tmp_file.name).parent)
-                    tmp_file.name = str(file_path)
+                file_path = self._ensure_local(url, use_cache)
             
-            # Read raster data
-            with rasterio.open(file_path) as src:
-                data = src.read(1)  # Read first band
+            # Read raster data, letting GDAL decode blocks in parallel
+            with self._gdal_env(gdal_threads), rasterio.open(file_path) as src:
                 profile = src.profile
                 bounds = src.bounds
                 
+                window = None
+                if clip_bounds is not None:
+                    window = self._clip_window(src, *clip_bounds)
+                    profile.update(
+                        width=window.width,
+                        height=window.height,
+                        transform=src.window_transform(window)
+                    )
+                    bounds = BoundingBox(*window_bounds(window, src.transform))
+                
+                if blockwise:
+                    band_window = window or Window(0, 0, src.width, src.height)
+                    logger.info(f"Opened raster for block reads: {country}_{sex}_{age_group}")
+                    return RasterBlocks(file_path, band_window, self._gdal_env), profile, bounds
+                
+                # Bands already decoded into the array cache are mapped from
+                # disk instead of decoded again, so batch loads hold pages,
+                # not copies
+                array_path = None
+                array_cached = False
+                if use_cache and self.cache_dir and not self.stream:
+                    array_path = self._array_cache_path(file_path, window)
+                    array_cached = (
+                        array_path.exists()
+                        and array_path.stat().st_mtime >= Path(file_path).stat().st_mtime
+                    )
+                
+                if array_cached:
+                    data = np.load(array_path, mmap_mode='r')
+                else:
+                    data = src.read(1, window=window)  # Read first band
+            
+            if array_path is not None and not array_cached:
+                data = self._cache_array(data, array_path)
+            
             logger.info(f"Successfully loaded raster: {country}_{sex}_{age_group}")
             return data, profile, bounds
             
@@ -60,23 +229,24 @@ class RasterLoader:
             logger.error(f"Failed to load raster {country}_{sex}_{age_group}: {str(e)}")
             return None, None, None
     
+    @staticmethod
+    def _clip_window(src, bounds, crs=None):
+        """Pixel window of an open raster covering bounds given in crs"""
+        if crs is not None and crs != src.crs:
+            bounds = transform_bounds(crs, src.crs, *bounds)
+        return pixel_window(bounds, src.transform, src.width, src.height)
+    
     def get_raster_metadata(self, country, sex, age_group):
         """Get metadata for a raster without loading full data"""
         url = self.get_raster_url(country, sex, age_group)
         
         try:
-            if self.cache_dir:
-                cached_file = get_cached_file(url, self.cache_dir)
-                if cached_file:
-                    file_path = cached_file
-                else:
-                    file_path = download_file(url, self.cache_dir)
+            if self.stream:
+                file_path = f"/vsicurl/{url}"
             else:
-                with tempfile.NamedTemporaryFile(suffix='.tif', delete=False) as tmp_file:
-                    file_path = download_file(url, Path(tmp_file.name).parent)
-                    tmp_file.name = str(file_path)
+                file_path = self._ensure_local(url)
             
-            with rasterio.open(file_path) as src:
+            with self._gdal_env(), rasterio.open(file_path) as src:
                 metadata = {
                     'country': country,
                     'sex': sex,
@@ -95,14 +265,25 @@ class RasterLoader:
             logger.error(f"Failed to get metadata for {country}_{sex}_{age_group}: {str(e)}")
             return None
     
-    def batch_load_rasters(self, countries=None, age_groups=None, sex_options=None):
+    def batch_load_rasters(self, countries=None, age_groups=None, sex_options=None, max_workers=16,
+                           clip_bounds=None, blockwise=False):
         """
         Load multiple rasters in batch
         
+        Rasters are read on a thread pool; rasterio releases the GIL while
+        reading and decoding, so the loads overlap. The CPUs are split
+        between the workers for GDAL's decoding threads, instead of each
+        load starting a decoding thread per CPU.
+        
         Args:
             countries: List of country codes
             age_groups: List of age groups
             sex_options: List of sex options
+            max_workers: Maximum number of rasters loaded at once
+            clip_bounds: Optional dict of country -> (bounds, crs); each
+                country's rasters are only read within those bounds
+            blockwise: Whether to return each band as a RasterBlocks, read
+                block by block when summarized, instead of an array
             
         Returns:
             dict: Nested dictionary of raster data
@@ -113,22 +294,45 @@ class RasterLoader:
             age_groups = AGE_GROUPS
         if sex_options is None:
             sex_options = SEX_OPTIONS
+        
+        tasks = [
+            (country, sex, age_group)
+            for country in countries
+            for sex in sex_options
+            for age_group in age_groups
+        ]
+        
+        # Fetch every missing raster concurrently up front so the loads
+        # below are served from the cache instead of downloading one by one
+        if self.cache_dir and tasks and not self.stream:
+            download_many([self.get_raster_url(*task) for task in tasks], self.cache_dir)
+        
+        results = {country: {sex: {} for sex in sex_options} for country in countries}
+        if not tasks:
+            return results
+        
+        workers = min(max_workers, len(tasks))
+        gdal_threads = max(1, (os.cpu_count() or 1) // workers)
+        
+        # map keeps results in task order, so the nested dict order is stable
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            clip_bounds = clip_bounds or {}
+            loaded = executor.map(
+                lambda task: self.load_raster(
+                    *task, clip_bounds=clip_bounds.get(task[0]), gdal_threads=gdal_threads,
+                    blockwise=blockwise
+                ),
+                tasks
+            )
             
-        results = {}
-        
-        for country in countries:
-            results[country] = {}
-            for sex in sex_options:
-                results[country][sex] = {}
-                for age_group in age_groups:
-                    data, profile, bounds = self.load_raster(country, sex, age_group)
-                    if data is not None:
-                        results[country][sex][age_group] = {
-                            'data': data,
-                            'profile': profile,
-                            'bounds': bounds
-                        }
-                    else:
-                        logger.warning(f"Failed to load {country}_{sex}_{age_group}")
+            for (country, sex, age_group), (data, profile, bounds) in zip(tasks, loaded):
+                if data is not None:
+                    results[country][sex][age_group] = {
+                        'data': data,
+                        'profile': profile,
+                        'bounds': bounds
+                    }
+                else:
+                    logger.warning(f"Failed to load {country}_{sex}_{age_group}")
         
         return results
\ No newline at end of file
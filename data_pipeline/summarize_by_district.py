@@ -1,101 +1,239 @@
 import geopandas as gpd
 import pandas as pd
 import numpy as np
-from rasterio.mask import mask
-from rasterio.features import geometry_mask
+from rasterio.features import rasterize
+from rasterio.windows import Window, transform as window_transform
 import logging
+from pathlib import Path
 from .config import GADM_FILES, COUNTRIES
-from .utils import reproject_geometry
+from .utils import pixel_window
 
 logger = logging.getLogger(__name__)
 
 class DistrictSummarizer:
-    def __init__(self):
+    def __init__(self, cache_dir=None):
+        """
+        Args:
+            cache_dir: Directory for GeoParquet copies of the parsed GADM
+                boundaries, or None to parse the source files every time
+        """
+        self.cache_dir = cache_dir
         self.admin_boundaries = {}
+        # District label rasters keyed by country and raster grid
+        self._label_cache = {}
+        # Boundaries reprojected to a raster CRS, keyed by country and CRS
+        self._reprojected = {}
         self.load_admin_boundaries()
     
     def load_admin_boundaries(self):
         """Load GADM administrative boundaries"""
         for country, file_path in GADM_FILES.items():
             try:
-                gdf = gpd.read_file(file_path)
-                # Standardize column names
-                gdf = gdf.rename(columns={
-                    'NAME_1': 'region',
-                    'NAME_2': 'district',
-                    'GID_2': 'district_id'
-                })
+                gdf = self._read_boundaries(file_path)
                 self.admin_boundaries[country] = gdf
                 logger.info(f"Loaded admin boundaries for {country}: {len(gdf)} districts")
             except Exception as e:
                 logger.error(f"Failed to load admin boundaries for {country}: {str(e)}")
     
+    def _read_boundaries(self, file_path):
+        """
+        Read one GADM file with standardized column names
+        
+        With a cache directory, the parsed boundaries are kept there as
+        GeoParquet and read back from it while it is newer than the source
+        file, which is much faster than parsing the GeoJSON again.
+        """
+        cache_file = None
+        if self.cache_dir:
+            cache_file = Path(self.cache_dir) / f"{Path(file_path).stem}.parquet"
+            if cache_file.exists() and cache_file.stat().st_mtime >= Path(file_path).stat().st_mtime:
+                return gpd.read_parquet(cache_file)
+        
+        gdf = gpd.read_file(file_path)
+        # Standardize column names
+        gdf = gdf.rename(columns={
+            'NAME_1': 'region',
+            'NAME_2': 'district',
+            'GID_2': 'district_id'
+        })
+        
+        if cache_file is not None:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            gdf.to_parquet(cache_file)
+        
+        return gdf
+    
+    def get_district_bounds(self):
+        """
+        Combined district bounds of each loaded country
+        
+        Returns:
+            dict: Country code -> ((left, bottom, right, top), crs), as taken
+                by RasterLoader.batch_load_rasters(clip_bounds=...)
+        """
+        return {
+            country: (tuple(districts_gdf.total_bounds), districts_gdf.crs)
+            for country, districts_gdf in self.admin_boundaries.items()
+        }
+    
     def summarize_raster_by_districts(self, raster_data, profile, country):
         """
         Summarize raster data by administrative districts
         
         Args:
-            raster_data: 2D numpy array
+            raster_data: 2D numpy array, or an iterable of (window, array)
+                blocks such as a load_rasters.RasterBlocks
             profile: Raster profile with CRS and transform
             country: Country code
             
         Returns:
-            GeoDataFrame: District summaries with population totals
+            DataFrame: District summaries with population totals. Geometry is
+                not carried along; join against admin_boundaries if needed.
         """
         if country not in self.admin_boundaries:
             logger.error(f"No admin boundaries loaded for {country}")
             return None
         
-        districts_gdf = self.admin_boundaries[country]
+        districts_gdf = self._get_districts(country, profile['crs'])
         
-        # Ensure same CRS
-        if districts_gdf.crs != profile['crs']:
-            districts_gdf = districts_gdf.to_crs(profile['crs'])
+        n_districts = len(districts_gdf)
+        clip_window, labels = self._get_district_labels(country, districts_gdf, profile)
         
-        results = []
+        # A full array is treated as a single block covering the raster
+        if isinstance(raster_data, np.ndarray):
+            blocks = [(Window(0, 0, profile['width'], profile['height']), raster_data)]
+        else:
+            blocks = raster_data
         
-        for idx, district in districts_gdf.iterrows():
-            try:
-                # Create mask for district
-                geom = [district.geometry]
-                district_mask = geometry_mask(
-                    geom, 
-                    out_shape=(profile['height'], profile['width']),
-                    transform=profile['transform'],
-                    invert=True
-                )
-                
-                # Extract data within district
-                district_data = raster_data[district_mask]
-                
-                # Remove nodata values
-                if profile.get('nodata') is not None:
-                    valid_data = district_data[district_data != profile['nodata']]
-                else:
-                    valid_data = district_data
-                
-                # Calculate total population
-                total_population = np.sum(valid_data) if len(valid_data) > 0 else 0
-                
-                results.append({
-                    'district_id': district['district_id'],
-                    'district': district['district'],
-                    'region': district.get('region', ''),
-                    'population': total_population,
-                    'pixel_count': len(valid_data)
-                })
-                
-            except Exception as e:
-                logger.warning(f"Failed to process district {district['district']}: {str(e)}")
+        # Accumulate population and pixel count for every district block by block
+        population = np.zeros(n_districts + 1)
+        pixel_count = np.zeros(n_districts + 1, dtype=np.int64)
+        
+        for window, block in blocks:
+            # Only the part of the block inside the districts' extent is read
+            overlap = self._window_overlap(window, clip_window)
+            if overlap is None:
                 continue
+            block_slices, label_slices = overlap
+            block = block[block_slices]
+            block_labels = labels[label_slices]
+            
+            # Send nodata pixels to label 0 (outside all districts) rather
+            # than compacting both arrays with a boolean index
+            if profile.get('nodata') is not None:
+                block_labels = np.where(block != profile['nodata'], block_labels, 0)
+            
+            # Flatten once; slices of the label raster are not contiguous, so
+            # each ravel may copy
+            block_labels = block_labels.ravel()
+            population += np.bincount(block_labels, weights=block.ravel(), minlength=n_districts + 1)
+            pixel_count += np.bincount(block_labels, minlength=n_districts + 1)
+        
+        population = population[1:]
+        pixel_count = pixel_count[1:]
         
-        result_gdf = gpd.GeoDataFrame(results, geometry=districts_gdf.geometry)
-        return result_gdf
+        return pd.DataFrame({
+            'district_id': districts_gdf['district_id'].to_numpy(),
+            'district': districts_gdf['district'].to_numpy(),
+            'region': districts_gdf['region'].to_numpy() if 'region' in districts_gdf.columns else '',
+            'population': population,
+            'pixel_count': pixel_count
+        })
+    
+    def _get_districts(self, country, crs):
+        """
+        A country's districts in the given CRS
+        
+        Reprojection runs once per country and CRS; every raster of a
+        country shares a CRS, so later calls reuse the stored copy. The copy
+        is rebuilt if the country's boundaries are replaced.
+        """
+        key = (country, str(crs))
+        source = self.admin_boundaries[country]
+        cached = self._reprojected.get(key)
+        
+        if cached is None or cached[0] is not source:
+            districts_gdf = source.to_crs(crs) if source.crs != crs else source
+            cached = self._reprojected[key] = (source, districts_gdf)
+        
+        return cached[1]
+    
+    def _get_district_labels(self, country, districts_gdf, profile):
+        """
+        Label raster for a country's districts on a raster grid
+        
+        Labels only cover the window of the raster grid spanned by the
+        districts' combined bounds, so pixels outside every district are
+        never touched. Every district is burned in as its 1-based position
+        (0 = outside all districts). WorldPop rasters for one country share a
+        grid, so the labels are built once and reused for every sex and age
+        group, until the country's districts change.
+        
+        Returns:
+            tuple: (window of the raster grid, label array for that window)
+        """
+        key = (country, profile['transform'], profile['height'], profile['width'], str(profile['crs']))
+        cached = self._label_cache.get(key)
+        
+        if cached is None or cached[0] is not districts_gdf:
+            clip_window = pixel_window(
+                districts_gdf.total_bounds, profile['transform'], profile['width'], profile['height']
+            )
+            n_districts = len(districts_gdf)
+            dtype = 'uint16' if n_districts < np.iinfo(np.uint16).max else 'int32'
+            
+            if clip_window.width > 0 and clip_window.height > 0:
+                labels = rasterize(
+                    ((geom, label) for label, geom in enumerate(districts_gdf.geometry, start=1)),
+                    out_shape=(clip_window.height, clip_window.width),
+                    transform=window_transform(clip_window, profile['transform']),
+                    fill=0,
+                    dtype=dtype
+                )
+            else:
+                labels = np.zeros((clip_window.height, clip_window.width), dtype=dtype)
+            
+            cached = self._label_cache[key] = (districts_gdf, clip_window, labels)
+        
+        return cached[1], cached[2]
+    
+    @staticmethod
+    def _window_overlap(window, clip_window):
+        """
+        Slices selecting the overlap of a raster block and the district window
+        
+        Returns:
+            tuple: (slices into the block, slices into the labels), or None
+                when the block lies outside the district window
+        """
+        row_start = max(window.row_off, clip_window.row_off)
+        row_stop = min(window.row_off + window.height, clip_window.row_off + clip_window.height)
+        col_start = max(window.col_off, clip_window.col_off)
+        col_stop = min(window.col_off + window.width, clip_window.col_off + clip_window.width)
+        
+        if row_stop <= row_start or col_stop <= col_start:
+            return None
+        
+        block_slices = (
+            slice(row_start - window.row_off, row_stop - window.row_off),
+            slice(col_start - window.col_off, col_stop - window.col_off)
+        )
+        label_slices = (
+            slice(row_start - clip_window.row_off, row_stop - clip_window.row_off),
+            slice(col_start - clip_window.col_off, col_stop - clip_window.col_off)
+        )
+        return block_slices, label_slices
     
     def batch_summarize_rasters(self, raster_data):
         """
         Summarize all rasters by districts
         
+        Rasters are summarized one after another, reusing the label raster
+        built for a country's first raster for the rest. np.where and
+        np.bincount release the GIL, so a thread pool could overlap the
+        reductions, but it is not used until a multi-core benchmark shows a
+        gain over this loop.
+        
         Args:
             raster_data: Dictionary from batch_load_rasters
             
@@ -139,25 +277,36 @@ class DistrictSummarizer:
         Returns:
             DataFrame: Combined summary with country, district, age, sex
         """
-        all_records = []
+        # Tag each district table with its raster's dimensions and stack them
+        frames = []
         
         for country, country_data in summaries.items():
             for sex, sex_data in country_data.items():
-                for age_group, district_gdf in sex_data.items():
-                    if district_gdf is not None:
-                        for idx, row in district_gdf.iterrows():
-                            record = {
-                                'country': country,
-                                'sex': sex,
-                                'age_group': age_group,
-                                'district_id': row['district_id'],
-                                'district': row['district'],
-                                'region': row.get('region', ''),
-                                'population': row['population']
-                            }
-                            all_records.append(record)
-        
-        return pd.DataFrame(all_records)
+                for age_group, district_summary in sex_data.items():
+                    if district_summary is not None:
+                        frames.append(pd.DataFrame({
+                            'country': country,
+                            'sex': sex,
+                            'age_group': age_group,
+                            'district_id': district_summary['district_id'].to_numpy(),
+                            'district': district_summary['district'].to_numpy(),
+                            'region': district_summary['region'].to_numpy() if 'region' in district_summary.columns else '',
+                            'population': district_summary['population'].to_numpy()
+                        }))
+        
+        if not frames:
+            return pd.DataFrame()
+        
+        combined = pd.concat(frames, ignore_index=True)
+        
+        # Store counts in single precision and dimensions as categoricals;
+        # totals are accumulated in float64 by the consumers
+        return combined.astype({
+            'population': 'float32',
+            'country': 'category',
+            'sex': 'category',
+            'age_group': 'category'
+        })
     
     def calculate_demographic_indicators(self, combined_summary):
         """
@@ -169,10 +318,8 @@ class DistrictSummarizer:
         Returns:
             DataFrame: District-level demographic indicators
         """
-        # Group by district and calculate indicators
-        district_totals = combined_summary.groupby(['country', 'district_id', 'district']).agg({
-            'population': 'sum'
-        }).reset_index()
+        if combined_summary.empty:
+            return pd.DataFrame()
         
         # Age structure calculations
         age_bins = {
@@ -180,34 +327,40 @@ class DistrictSummarizer:
             'working_age': ['15_19', '20_24', '25_29', '30_34', '35_39', '40_44', '45_49', '50_54', '55_59'],
             'elderly': ['60_64', '65_69', '70_74', '75_79', '80_plus']
         }
+        age_bin_lookup = {age_group: age_bin for age_bin, age_groups in age_bins.items() for age_group in age_groups}
         
-        indicators = []
+        # Counts are stored as float32; accumulate totals in float64
+        district_keys = ['country', 'district_id', 'district']
+        summary = combined_summary[district_keys + ['sex']].assign(
+            age_bin=combined_summary['age_group'].astype(str).map(age_bin_lookup),
+            population=combined_summary['population'].astype(np.float64)
+        )
         
-        for (country, district_id, district), group in combined_summary.groupby(['country', 'district_id', 'district']):
-            total_pop = group['population'].sum()
-            
-            if total_pop > 0:
-                # Age structure
-                children_pop = group[group['age_group'].isin(age_bins['children'])]['population'].sum()
-                working_pop = group[group['age_group'].isin(age_bins['working_age'])]['population'].sum()
-                elderly_pop = group[group['age_group'].isin(age_bins['elderly'])]['population'].sum()
-                
-                # Sex ratio
-                male_pop = group[group['sex'] == 'M']['population'].sum()
-                female_pop = group[group['sex'] == 'F']['population'].sum()
-                sex_ratio = male_pop / female_pop if female_pop > 0 else 0
-                
-                indicators.append({
-                    'country': country,
-                    'district_id': district_id,
-                    'district': district,
-                    'total_population': total_pop,
-                    'child_percentage': (children_pop / total_pop) * 100,
-                    'working_age_percentage': (working_pop / total_pop) * 100,
-                    'elderly_percentage': (elderly_pop / total_pop) * 100,
-                    'sex_ratio': sex_ratio,
-                    'male_population': male_pop,
-                    'female_population': female_pop
-                })
-        
-        return pd.DataFrame(indicators)
\ No newline at end of file
+        # Group by district once per breakdown; only populated districts get indicators
+        total_pop = summary.groupby(district_keys, observed=True)['population'].sum()
+        total_pop = total_pop[total_pop > 0]
+        
+        age_pop = (
+            summary.groupby(district_keys + ['age_bin'], observed=True)['population'].sum()
+            .unstack('age_bin', fill_value=0)
+            .reindex(index=total_pop.index, columns=list(age_bins), fill_value=0)
+        )
+        sex_pop = (
+            summary.groupby(district_keys + ['sex'], observed=True)['population'].sum()
+            .unstack('sex', fill_value=0)
+            .reindex(index=total_pop.index, columns=['M', 'F'], fill_value=0)
+        )
+        male_pop = sex_pop['M']
+        female_pop = sex_pop['F']
+        
+        indicators = pd.DataFrame({
+            'total_population': total_pop,
+            'child_percentage': (age_pop['children'] / total_pop) * 100,
+            'working_age_percentage': (age_pop['working_age'] / total_pop) * 100,
+            'elderly_percentage': (age_pop['elderly'] / total_pop) * 100,
+            'sex_ratio': (male_pop / female_pop).where(female_pop > 0, 0),
+            'male_population': male_pop,
+            'female_population': female_pop
+        })
+        
+        return indicators.reset_index()
\ No newline at end of file
@@ -1,9 +1,11 @@
 import logging
+import math
 import sys
 from pathlib import Path
 import json
 import pandas as pd
 from datetime import datetime
+from rasterio.windows import Window, from_bounds
 
 def setup_logging(level=logging.INFO):
     """Setup logging configuration"""
@@ -31,12 +33,57 @@ def save_dataframe(df, file_path, format='csv'):
     if format == 'csv':
         df.to_csv(file_path, index=False)
     elif format == 'parquet':
-        df.to_parquet(file_path, index=False)
+        df.to_parquet(file_path, index=False, compression='zstd')
     elif format == 'json':
         df.to_json(file_path, orient='records', indent=2)
     else:
         raise ValueError(f"Unsupported format: {format}")
 
+def save_population_table(combined_summary, file_path):
+    """
+    Save the long-format population summary as a compressed Parquet table
+    
+    Dimension columns are stored as categoricals so they are dictionary
+    encoded on disk and come back as categoricals when loaded.
+    
+    Args:
+        combined_summary: DataFrame from DistrictSummarizer.create_combined_summary
+        file_path: Output Parquet path
+    """
+    table = combined_summary.astype({
+        column: 'category'
+        for column in ('country', 'sex', 'age_group', 'district')
+        if column in combined_summary.columns
+    })
+    table.to_parquet(file_path, index=False, compression='zstd')
+
+def load_population_table(file_path, country=None, age_groups=None, sex=None, columns=None):
+    """
+    Load population rows matching the given filters from a Parquet table
+    
+    Filters are pushed down to the Parquet reader, so row groups that cannot
+    match are skipped and only the requested columns are decoded.
+    
+    Args:
+        file_path: Parquet path written by save_population_table
+        country: Country code to keep, or None for all
+        age_groups: Age groups to keep, or None for all
+        sex: Sex to keep, or None for all
+        columns: Columns to load, or None for all
+        
+    Returns:
+        DataFrame: Matching population rows
+    """
+    filters = []
+    if country is not None:
+        filters.append(('country', '==', country))
+    if age_groups is not None:
+        filters.append(('age_group', 'in', list(age_groups)))
+    if sex is not None:
+        filters.append(('sex', '==', sex))
+    
+    return pd.read_parquet(file_path, columns=columns, filters=filters or None)
+
 def create_output_filename(base_name, extension, timestamp=True):
     """Create output filename with optional timestamp"""
     if timestamp:
@@ -62,6 +109,29 @@ def format_age_group_display(age_group):
     else:
         return age_group.replace('_', '-')
 
+def pixel_window(bounds, transform, width, height):
+    """
+    Pixel-aligned window of a raster grid covering some bounds
+    
+    Args:
+        bounds: (left, bottom, right, top) in the raster's CRS
+        transform: Affine transform of the raster grid
+        width: Raster width in pixels
+        height: Raster height in pixels
+        
+    Returns:
+        Window: Window snapped outwards to whole pixels and clipped to the
+            raster extent; zero-sized if the bounds miss the raster
+    """
+    bounds_window = from_bounds(*bounds, transform=transform)
+    
+    col_start = max(math.floor(bounds_window.col_off), 0)
+    row_start = max(math.floor(bounds_window.row_off), 0)
+    col_stop = min(math.ceil(bounds_window.col_off + bounds_window.width), width)
+    row_stop = min(math.ceil(bounds_window.row_off + bounds_window.height), height)
+    
+    return Window(col_start, row_start, max(col_stop - col_start, 0), max(row_stop - row_start, 0))
+
 def calculate_percentage(numerator, denominator):
     """Calculate percentage safely"""
     if denominator == 0:
@@ -82,4 +152,4 @@ def check_disk_space(path, required_gb=1):
     return free_gb >= required_gb
 
 # Import the cache functions for backward compatibility
-from .cache_utils import download_file, get_cached_file
\ No newline at end of file
+from .cache_utils import download_file, download_many, get_cached_file, ARRAY_CACHE_DIRNAME
\ No newline at end of file
@@ -8,13 +8,13 @@ from pathlib import Path
 import argparse
 import time
 
-from data_pipeline.config import OUTPUT_DIR
+from data_pipeline.config import OUTPUT_DIR, CACHE_DIR, POPULATION_TABLE, ensure_dirs
 from data_pipeline.load_rasters import RasterLoader
-from data_pipeline.extract_metadata import create_metadata_summary, export_metadata_to_csv
+from data_pipeline.extract_metadata import collect_raster_metadata
 from data_pipeline.summarize_by_district import DistrictSummarizer
-from data_pipeline.utils import setup_logging, save_json, save_dataframe
+from data_pipeline.utils import setup_logging, save_json, save_dataframe, save_population_table
 
-def run_pipeline(countries=None, age_groups=None, sex_options=None, use_cache=True):
+def run_pipeline(countries=None, age_groups=None, sex_options=None, use_cache=True, stream=False):
     """
     Run the complete data pipeline
     
@@ -23,6 +23,7 @@ def run_pipeline(countries=None, age_groups=None, sex_options=None, use_cache=Tr
         age_groups: List of age groups to process
         sex_options: List of sex options to process
         use_cache: Whether to use cached files
+        stream: Whether to read rasters over HTTP instead of downloading them
     
     Returns:
         dict: Pipeline results
@@ -31,28 +32,29 @@ def run_pipeline(countries=None, age_groups=None, sex_options=None, use_cache=Tr
     logger = logging.getLogger(__name__)
     
     logger.info("Starting WorldPop data pipeline")
+    ensure_dirs()
     
     # Initialize components
-    raster_loader = RasterLoader()
-    district_summarizer = DistrictSummarizer()
+    raster_loader = RasterLoader(cache_dir=CACHE_DIR if use_cache else None, stream=stream)
+    district_summarizer = DistrictSummarizer(cache_dir=CACHE_DIR if use_cache else None)
     
     # Step 1: Load raster data
     logger.info("Step 1: Loading raster data")
+    # Only the part of each raster covering the country's districts is read,
+    # and only one block at a time while it is summarized
     raster_data = raster_loader.batch_load_rasters(
         countries=countries,
         age_groups=age_groups,
-        sex_options=sex_options
+        sex_options=sex_options,
+        clip_bounds=district_summarizer.get_district_bounds(),
+        blockwise=True
     )
     
     # Step 2: Extract and save metadata
     logger.info("Step 2: Extracting metadata")
-    metadata_summary = create_metadata_summary(raster_data)
+    metadata_summary, metadata_table = collect_raster_metadata(raster_data)
     save_json(metadata_summary, OUTPUT_DIR / "metadata_summary.json")
-    
-    export_metadata_to_csv(
-        raster_data, 
-        OUTPUT_DIR / "raster_metadata.csv"
-    )
+    save_dataframe(metadata_table, OUTPUT_DIR / "raster_metadata.csv")
     
     # Step 3: Summarize by districts
     logger.info("Step 3: Summarizing by districts")
@@ -61,19 +63,19 @@ def run_pipeline(countries=None, age_groups=None, sex_options=None, use_cache=Tr
     # Step 4: Create combined summary
     logger.info("Step 4: Creating combined summary")
     combined_summary = district_summarizer.create_combined_summary(district_summaries)
-    save_dataframe(combined_summary, OUTPUT_DIR / "combined_population_summary.csv")
+    save_population_table(combined_summary, POPULATION_TABLE)
     
     # Step 5: Calculate demographic indicators
     logger.info("Step 5: Calculating demographic indicators")
     demographic_indicators = district_summarizer.calculate_demographic_indicators(combined_summary)
-    save_dataframe(demographic_indicators, OUTPUT_DIR / "demographic_indicators.csv")
+    indicators_path = OUTPUT_DIR / "demographic_indicators.parquet"
+    save_dataframe(demographic_indicators, indicators_path, format='parquet')
     
-    # Save final results
+    # Save final results. Tables are referenced by path rather than
+    # serialized again; raster arrays stay in the raster cache
     results = {
-        'raster_data': {k: v for k, v in raster_data.items() if any(v.values())},
-        'district_summaries': district_summaries,
-        'combined_summary': combined_summary.to_dict('records'),
-        'demographic_indicators': demographic_indicators.to_dict('records'),
+        'combined_summary_path': str(POPULATION_TABLE),
+        'demographic_indicators_path': str(indicators_path),
         'metadata_summary': metadata_summary,
         'execution_time': time.time() - start_time
     }
@@ -96,6 +98,8 @@ def main():
                        help='Sex options to process (default: M F)')
     parser.add_argument('--no-cache', action='store_true',
                        help='Disable cache')
+    parser.add_argument('--stream', action='store_true',
+                       help='Read rasters over HTTP range requests instead of downloading them')
     parser.add_argument('--verbose', action='store_true',
                        help='Enable verbose logging')
     
@@ -110,7 +114,8 @@ def main():
             countries=args.countries,
             age_groups=args.age_groups,
             sex_options=args.sex_options,
-            use_cache=not args.no_cache
+            use_cache=not args.no_cache,
+            stream=args.stream
         )
         
         # Print summary
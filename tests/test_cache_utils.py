@@ -1,4 +1,6 @@
 import pytest
+import io
+import os
 import time
 import json
 from pathlib import Path
@@ -6,8 +8,10 @@ from unittest.mock import Mock, patch, MagicMock
 
 from data_pipeline.cache_utils import (
     generate_cache_key,
+    ARRAY_CACHE_DIRNAME,
     get_cached_file,
     download_file,
+    download_many,
     clear_old_cache,
     get_cache_size
 )
@@ -26,21 +30,19 @@ class TestCacheUtilities:
         different_url = "https://example.com/other.tif"
         different_key = generate_cache_key(different_url)
         assert key != different_key
+        
+        # Same 32 hex characters as the previous MD5 keys
+        assert len(key) == 32
 
     def test_get_cached_file_exists_valid(self, test_cache_dir):
         url = "https://example.com/data.tif"
         cache_key = generate_cache_key(url)
         cache_file = test_cache_dir / f"{cache_key}.tif"
-        metadata_file = test_cache_dir / f"{cache_key}.json"
         
-        # Create test files
+        # Create test file, 100 seconds old
         cache_file.write_text("test data")
-        metadata = {
-            'url': url,
-            'timestamp': time.time() - 100,  # 100 seconds old
-            'size': 9
-        }
-        metadata_file.write_text(json.dumps(metadata))
+        old_time = time.time() - 100
+        os.utime(cache_file, (old_time, old_time))
         
         result = get_cached_file(url, test_cache_dir, max_age=3600)  # 1 hour max age
         
@@ -48,22 +50,16 @@ class TestCacheUtilities:
         
         # Clean up
         cache_file.unlink()
-        metadata_file.unlink()
 
     def test_get_cached_file_expired(self, test_cache_dir):
         url = "https://example.com/data.tif"
         cache_key = generate_cache_key(url)
         cache_file = test_cache_dir / f"{cache_key}.tif"
-        metadata_file = test_cache_dir / f"{cache_key}.json"
         
-        # Create test files with old timestamp
+        # Create test file, 2 hours old
         cache_file.write_text("test data")
-        metadata = {
-            'url': url,
-            'timestamp': time.time() - 7200,  # 2 hours old
-            'size': 9
-        }
-        metadata_file.write_text(json.dumps(metadata))
+        old_time = time.time() - 7200
+        os.utime(cache_file, (old_time, old_time))
         
         result = get_cached_file(url, test_cache_dir, max_age=3600)  # 1 hour max age
         
@@ -71,36 +67,77 @@ class TestCacheUtilities:
         
         # Clean up
         cache_file.unlink()
-        metadata_file.unlink()
 
-    def test_get_cached_file_missing_metadata(self, test_cache_dir):
+    def test_get_cached_file_without_metadata(self, test_cache_dir):
         url = "https://example.com/data.tif"
         cache_key = generate_cache_key(url)
         cache_file = test_cache_dir / f"{cache_key}.tif"
         
-        # Create only cache file, no metadata
+        # A fresh file is valid on its own; no JSON sidecar is needed
         cache_file.write_text("test data")
         
         result = get_cached_file(url, test_cache_dir)
         
-        assert result is None
+        assert result == cache_file
         
         # Clean up
         cache_file.unlink()
 
+    def test_get_cached_file_legacy_key(self, test_cache_dir):
+        import hashlib
+        
+        url = "https://example.com/legacy.tif"
+        legacy_key = hashlib.md5(url.encode()).hexdigest()
+        legacy_file = test_cache_dir / f"{legacy_key}.tif"
+        legacy_metadata = test_cache_dir / f"{legacy_key}.json"
+        
+        legacy_file.write_text("test data")
+        legacy_metadata.write_text(json.dumps({'url': url, 'timestamp': time.time(), 'size': 9}))
+        old_time = time.time() - 100
+        os.utime(legacy_file, (old_time, old_time))
+        
+        result = get_cached_file(url, test_cache_dir, max_age=3600)
+        
+        # The entry is served and moved to the current key
+        cache_key = generate_cache_key(url)
+        assert result == test_cache_dir / f"{cache_key}.tif"
+        assert result.read_text() == "test data"
+        assert not legacy_file.exists()
+        assert not legacy_metadata.exists()
+        # The entry keeps its original age
+        assert result.stat().st_mtime == pytest.approx(old_time)
+        
+        # Clean up
+        result.unlink()
+
+    def test_get_cached_file_missing_metadata(self, tmp_path):
+        import hashlib
+        
+        url = "https://example.com/partial.tif"
+        legacy_file = tmp_path / f"{hashlib.md5(url.encode()).hexdigest()}.tif"
+        
+        # A legacy file without its sidecar may be an interrupted download
+        legacy_file.write_text("partial data")
+        
+        result = get_cached_file(url, tmp_path)
+        
+        assert result is None
+        assert not legacy_file.exists()
+        assert not (tmp_path / f"{generate_cache_key(url)}.tif").exists()
+
     def test_get_cached_file_not_exists(self, test_cache_dir):
         url = "https://example.com/nonexistent.tif"
         result = get_cached_file(url, test_cache_dir)
         
         assert result is None
 
-    @patch('requests.get')
-    def test_download_file_success(self, mock_get, test_cache_dir):
+    @patch('data_pipeline.cache_utils._SESSION')
+    def test_download_file_success(self, mock_session, test_cache_dir):
         # Mock response
         mock_response = Mock()
-        mock_response.iter_content.return_value = [b"chunk1", b"chunk2", b"chunk3"]
+        mock_response.raw = io.BytesIO(b"chunk1chunk2chunk3")
         mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+        mock_session.get.return_value = mock_response
         
         url = "https://example.com/data.tif"
         result = download_file(url, test_cache_dir)
@@ -114,15 +151,16 @@ class TestCacheUtilities:
         metadata_file = test_cache_dir / f"{cache_key}.json"
         
         assert cache_file.exists()
-        assert metadata_file.exists()
+        assert cache_file.read_bytes() == b"chunk1chunk2chunk3"
+        assert not metadata_file.exists()
+        assert not (test_cache_dir / f"{cache_key}.tif.part").exists()
         
         # Clean up
         cache_file.unlink()
-        metadata_file.unlink()
 
-    @patch('requests.get')
-    def test_download_file_failure(self, mock_get, test_cache_dir):
-        mock_get.side_effect = Exception("Network error")
+    @patch('data_pipeline.cache_utils._SESSION')
+    def test_download_file_failure(self, mock_session, test_cache_dir):
+        mock_session.get.side_effect = Exception("Network error")
         
         url = "https://example.com/data.tif"
         
@@ -137,12 +175,61 @@ class TestCacheUtilities:
         assert not cache_file.exists()
         assert not metadata_file.exists()
 
+    def test_download_file_interrupted(self, test_cache_dir):
+        mock_session = Mock()
+        mock_response = Mock()
+        
+        # Stream that delivers one block and then drops the connection
+        mock_response.raw = Mock()
+        mock_response.raw.read.side_effect = [b"chunk1", ConnectionError("Connection dropped")]
+        mock_session.get.return_value = mock_response
+        
+        url = "https://example.com/data.tif"
+        
+        with pytest.raises(ConnectionError):
+            download_file(url, test_cache_dir, session=mock_session)
+        
+        # Neither the partial nor the final file should be left behind
+        cache_key = generate_cache_key(url)
+        assert not (test_cache_dir / f"{cache_key}.tif").exists()
+        assert not (test_cache_dir / f"{cache_key}.tif.part").exists()
+
+    def test_download_many(self, test_cache_dir):
+        mock_session = Mock()
+        
+        def fake_get(url, stream):
+            if url.endswith("bad.tif"):
+                raise Exception("Network error")
+            response = Mock()
+            response.raw = io.BytesIO(url.encode())
+            return response
+        
+        mock_session.get.side_effect = fake_get
+        urls = [f"https://example.com/data{i}.tif" for i in range(3)] + ["https://example.com/bad.tif"]
+        
+        results = download_many(urls, test_cache_dir, max_workers=4, session=mock_session)
+        
+        assert set(results) == set(urls)
+        assert results["https://example.com/bad.tif"] is None
+        for url in urls[:3]:
+            assert results[url].read_bytes() == url.encode()
+        
+        # A second call is served from the cache without new requests
+        mock_session.get.reset_mock()
+        download_many(urls[:3], test_cache_dir, session=mock_session)
+        mock_session.get.assert_not_called()
+        
+        # Clean up
+        for url in urls[:3]:
+            results[url].unlink()
+
     def test_clear_old_cache(self, test_cache_dir):
         current_time = time.time()
         
         # Create some test cache files
         files_to_keep = []
         files_to_remove = []
+        sidecar_files = []
         
         for i in range(3):
             url = f"https://example.com/data{i}.tif"
@@ -153,37 +240,62 @@ class TestCacheUtilities:
             cache_file.write_text("data")
             
             if i < 2:  # First two files are old
-                metadata = {
-                    'url': url,
-                    'timestamp': current_time - 7200,  # 2 hours old
-                    'size': 4
-                }
-                files_to_remove.append((cache_file, metadata_file))
+                file_time = current_time - 7200  # 2 hours old
+                files_to_remove.append(cache_file)
             else:  # Last file is recent
-                metadata = {
-                    'url': url,
-                    'timestamp': current_time - 1800,  # 30 minutes old
-                    'size': 4
-                }
-                files_to_keep.append((cache_file, metadata_file))
+                file_time = current_time - 1800  # 30 minutes old
+                files_to_keep.append(cache_file)
+            
+            os.utime(cache_file, (file_time, file_time))
             
-            metadata_file.write_text(json.dumps(metadata))
+            # Leftover sidecar from an older cache layout
+            metadata_file.write_text(json.dumps({'url': url, 'timestamp': file_time, 'size': 4}))
+            sidecar_files.append(metadata_file)
         
         # Clear old cache (1 hour max age)
         clear_old_cache(test_cache_dir, max_age=3600)
         
         # Verify old files were removed, recent files kept
-        for cache_file, metadata_file in files_to_remove:
+        for cache_file in files_to_remove:
             assert not cache_file.exists()
+        
+        # Sidecars go with their expired raster
+        for metadata_file in sidecar_files[:2]:
             assert not metadata_file.exists()
         
-        for cache_file, metadata_file in files_to_keep:
+        for cache_file in files_to_keep:
             assert cache_file.exists()
-            assert metadata_file.exists()
             
             # Clean up
             cache_file.unlink()
-            metadata_file.unlink()
+        sidecar_files[2].unlink()
+
+    def test_clear_old_cache_keeps_legacy_entries(self, tmp_path):
+        import hashlib
+        
+        url = "https://example.com/legacy.tif"
+        legacy_key = hashlib.md5(url.encode()).hexdigest()
+        legacy_file = tmp_path / f"{legacy_key}.tif"
+        legacy_metadata = tmp_path / f"{legacy_key}.json"
+        orphan_metadata = tmp_path / f"{hashlib.md5(b'gone').hexdigest()}.json"
+        
+        legacy_file.write_text("test data")
+        legacy_metadata.write_text(json.dumps({'url': url, 'timestamp': time.time(), 'size': 9}))
+        orphan_metadata.write_text("{}")
+        
+        clear_old_cache(tmp_path, max_age=3600)
+        
+        # The sidecar of a live legacy file survives; one without a raster does not
+        assert legacy_metadata.exists()
+        assert not orphan_metadata.exists()
+        
+        # So the entry is still migrated instead of discarded as truncated
+        result = get_cached_file(url, tmp_path, max_age=3600)
+        
+        assert result == tmp_path / f"{generate_cache_key(url)}.tif"
+        assert result.read_text() == "test data"
+        assert not legacy_file.exists()
+        assert not legacy_metadata.exists()
 
     def test_get_cache_size(self, test_cache_dir):
         # Create some test files
@@ -201,6 +313,76 @@ class TestCacheUtilities:
         file1.unlink()
         file2.unlink()
 
+    def test_clear_old_cache_removes_arrays(self, tmp_path):
+        current_time = time.time()
+        old_key = generate_cache_key("https://example.com/old.tif")
+        new_key = generate_cache_key("https://example.com/new.tif")
+        
+        for cache_key, age in ((old_key, 7200), (new_key, 1800)):
+            cache_file = tmp_path / f"{cache_key}.tif"
+            cache_file.write_text("data")
+            os.utime(cache_file, (current_time - age, current_time - age))
+        
+        array_dir = tmp_path / ARRAY_CACHE_DIRNAME
+        array_dir.mkdir()
+        old_arrays = [array_dir / f"{old_key}.npy", array_dir / f"{old_key}_0_0_5_5.npy"]
+        new_arrays = [array_dir / f"{new_key}.npy", array_dir / f"{new_key}_0_0_5_5.npy"]
+        orphan_array = array_dir / f"{generate_cache_key('https://example.com/gone.tif')}.npy"
+        for array_file in old_arrays + new_arrays + [orphan_array]:
+            array_file.write_bytes(b"x" * 10)
+        
+        clear_old_cache(tmp_path, max_age=3600)
+        
+        # Arrays go with their expired or missing GeoTIFF; live ones stay
+        assert not any(array_file.exists() for array_file in old_arrays + [orphan_array])
+        assert all(array_file.exists() for array_file in new_arrays)
+
+    def test_clear_old_cache_removes_partial_arrays(self, tmp_path):
+        current_time = time.time()
+        live_key = generate_cache_key("https://example.com/live.tif")
+        (tmp_path / f"{live_key}.tif").write_text("data")
+        
+        array_dir = tmp_path / ARRAY_CACHE_DIRNAME
+        array_dir.mkdir()
+        orphan_part = array_dir / f"{generate_cache_key('https://example.com/gone.tif')}.npy.part"
+        stale_part = array_dir / f"{live_key}_0_0_5_5.npy.part"
+        writing_part = array_dir / f"{live_key}.npy.part"
+        for part_file in (orphan_part, stale_part, writing_part):
+            part_file.write_bytes(b"x" * 10)
+        os.utime(stale_part, (current_time - 7200, current_time - 7200))
+        
+        clear_old_cache(tmp_path, max_age=3600)
+        
+        # Partial arrays of missing GeoTIFFs or older than max_age are removed;
+        # a recent one may still be being written
+        assert not orphan_part.exists()
+        assert not stale_part.exists()
+        assert writing_part.exists()
+        assert get_cache_size(tmp_path) == len("data") + 10
+
+    def test_clear_old_cache_removes_partial_downloads(self, tmp_path):
+        current_time = time.time()
+        stale_part = tmp_path / f"{generate_cache_key('https://example.com/killed.tif')}.tif.part"
+        active_part = tmp_path / f"{generate_cache_key('https://example.com/active.tif')}.tif.part"
+        for part_file in (stale_part, active_part):
+            part_file.write_bytes(b"x" * 10)
+        os.utime(stale_part, (current_time - 7200, current_time - 7200))
+        
+        clear_old_cache(tmp_path, max_age=3600)
+        
+        # A download older than max_age was killed; a recent one may still be running
+        assert not stale_part.exists()
+        assert active_part.exists()
+        assert get_cache_size(tmp_path) == 10
+
+    def test_get_cache_size_includes_arrays(self, tmp_path):
+        (tmp_path / "test1.tif").write_bytes(b"x" * 1000)
+        array_dir = tmp_path / ARRAY_CACHE_DIRNAME
+        array_dir.mkdir()
+        (array_dir / "test1.npy").write_bytes(b"y" * 4000)
+        
+        assert get_cache_size(tmp_path) == 5000
+
     def test_get_cache_size_empty(self, test_cache_dir):
         total_size = get_cache_size(test_cache_dir)
         assert total_size == 0
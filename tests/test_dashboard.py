@@ -3,14 +3,23 @@ import pandas as pd
 import streamlit as st
 from unittest.mock import Mock, patch, MagicMock
 
-from dashboard.filters import create_filters
+from dashboard.filters import create_filters, render_live_statistics
 from dashboard.charts import (
     create_choropleth_map,
     create_age_sex_pyramid,
     create_population_summary_chart,
-    create_empty_figure
+    create_empty_figure,
+    EMPTY_FIGURE
+)
+from dashboard.text_blocks import get_public_health_insights, calculate_demographic_metrics
+from dashboard.app import (
+    load_sample_data,
+    get_filtered_data,
+    summarize_population,
+    get_chart_figures,
+    get_population_metrics,
+    get_session_filtered_data
 )
-from dashboard.text_blocks import get_public_health_insights
 
 class TestDashboardFilters:
     
@@ -49,6 +58,29 @@ class TestDashboardFilters:
         assert age_groups == ['0-4']
         assert sex == "M"
 
+    @patch('streamlit.sidebar.metric')
+    def test_render_live_statistics_uses_filtered_frame(self, mock_metric, sample_data):
+        filtered = sample_data[sample_data['country'] == 'KEN']
+        
+        render_live_statistics(sample_data, filtered, ['0-4', '5-9'])
+        
+        mock_metric.assert_called_with("📊 Age Groups", 2)
+
+    @patch('streamlit.session_state', new_callable=dict)
+    def test_render_live_statistics_reuses_cached_statistics(self, mock_session_state, sample_data):
+        render_live_statistics(sample_data, sample_data, ['0-4', '5-9'], cache_key=('All', (), 'All'))
+        cached = mock_session_state['live_statistics']
+        assert cached[0] == ('All', (), 'All')
+        assert cached[1][0] == 3400
+        
+        # Same key: the stored statistics are reused even for a different frame
+        render_live_statistics(sample_data, sample_data.iloc[:1], ['0-4'], cache_key=('All', (), 'All'))
+        assert mock_session_state['live_statistics'] is cached
+        
+        # New key: statistics are recomputed
+        render_live_statistics(sample_data, sample_data.iloc[:1], ['0-4'], cache_key=('KEN', (), 'All'))
+        assert mock_session_state['live_statistics'][1][0] == 1000
+
 class TestDashboardCharts:
     
     @pytest.fixture
@@ -74,6 +106,50 @@ class TestDashboardCharts:
         assert hasattr(fig, 'data')
         assert hasattr(fig, 'layout')
 
+    def test_create_choropleth_map_categorical_districts(self, sample_chart_data):
+        categorical_data = sample_chart_data.astype({'district': 'category'})
+        fig = create_choropleth_map(categorical_data, "All")
+        
+        assert len(fig.data) == 1
+        assert sorted(fig.data[0].lat) == sorted([-1.286389, -4.0435])
+
+    def test_create_choropleth_map_unknown_district(self):
+        data = pd.DataFrame({
+            'country': ['KEN', 'UGA'],
+            'district': ['Nowhere', 'Kampala'],
+            'population': [100, 200]
+        })
+        fig = create_choropleth_map(data, "KEN")
+        
+        # Only the selected country is plotted; unknown districts fall back to 0, 0
+        assert list(fig.data[0].text) == ['Nowhere']
+        assert list(fig.data[0].lat) == [0]
+        assert list(fig.data[0].lon) == [0]
+
+    def test_create_choropleth_map_marker_sizes_match_plotly_express(self):
+        import plotly.express as px
+        
+        data = load_sample_data()
+        fig = create_choropleth_map(data, "All")
+        
+        # The marker sizing plotly express applied before the switch to graph_objects
+        district_data = data.groupby(['country', 'district'], observed=True)['population'].sum().reset_index()
+        express_fig = px.scatter_mapbox(
+            district_data, lat=[0] * len(district_data), lon=[0] * len(district_data),
+            size="population", size_max=50
+        )
+        
+        marker = fig.data[0].marker
+        express_marker = express_fig.data[0].marker
+        assert marker.sizemode == express_marker.sizemode
+        assert marker.sizeref == pytest.approx(express_marker.sizeref)
+        assert list(marker.size) == list(express_marker.size)
+
+    def test_create_choropleth_map_empty_data(self):
+        fig = create_choropleth_map(pd.DataFrame(), "All")
+        
+        assert fig is EMPTY_FIGURE
+
     def test_create_age_sex_pyramid(self, sample_chart_data):
         fig = create_age_sex_pyramid(sample_chart_data)
         
@@ -82,6 +158,15 @@ class TestDashboardCharts:
         # Should have two traces (male and female)
         assert len(fig.data) == 2
 
+    def test_create_age_sex_pyramid_values(self, sample_chart_data):
+        fig = create_age_sex_pyramid(sample_chart_data)
+        
+        male, female = fig.data
+        assert list(male.y) == ['0-4', '5-9']
+        assert list(male.x) == [-1800, 0]
+        assert list(female.x) == [0, 1600]
+        assert list(fig.layout.xaxis.tickvals) == [-1800, 0, 1800]
+
     def test_create_age_sex_pyramid_empty_data(self):
         empty_data = pd.DataFrame()
         fig = create_age_sex_pyramid(empty_data)
@@ -123,23 +208,38 @@ class TestPublicHealthInsights:
             'population': [500, 480, 400, 380, 350, 340, 100, 80]  # High youth population
         })
 
-    def test_get_public_health_insights(self, sample_insight_data):
-        insights = get_public_health_insights(sample_insight_data, "KEN", ['0-4', '5-9'], "All")
+    @pytest.fixture
+    def mock_st(self):
+        with patch('dashboard.text_blocks.st') as mock_st:
+            mock_st.tabs.side_effect = lambda labels: [MagicMock() for _ in labels]
+            mock_st.columns.side_effect = lambda spec: [MagicMock() for _ in range(spec if isinstance(spec, int) else len(spec))]
+            yield mock_st
+
+    @staticmethod
+    def _rendered_text(mock_st):
+        return ' '.join(str(arg) for call in mock_st.mock_calls for arg in call.args)
+
+    def test_get_public_health_insights(self, mock_st, sample_insight_data):
+        get_public_health_insights(calculate_demographic_metrics(sample_insight_data), "KEN", ['0-4', '5-9'], "All")
         
-        assert isinstance(insights, str)
-        assert len(insights) > 0
-        # Should contain key sections
-        assert "Population Overview" in insights
-        assert "Key Demographic Indicators" in insights
-        assert "Service Planning Considerations" in insights
+        mock_st.tabs.assert_called_once()
+        mock_st.error.assert_not_called()
+        # Should render the key sections
+        subheaders = [call.args[0] for call in mock_st.subheader.call_args_list]
+        assert "🌍 Population Overview" in subheaders
+        assert "🔍 Quick Glance" in subheaders
+        assert "💡 Key Insights" in subheaders
+        assert "🎯 Actionable Recommendations" in subheaders
+        mock_st.dataframe.assert_called_once()
 
-    def test_get_public_health_insights_empty_data(self):
-        empty_data = pd.DataFrame()
-        insights = get_public_health_insights(empty_data, "All", [], "All")
+    def test_get_public_health_insights_empty_data(self, mock_st):
+        get_public_health_insights(None, "All", [], "All")
         
-        assert "No data available" in insights
+        mock_st.error.assert_called_once()
+        assert "No data available" in mock_st.error.call_args.args[0]
+        mock_st.tabs.assert_not_called()
 
-    def test_get_public_health_insights_high_youth(self):
+    def test_get_public_health_insights_high_youth(self, mock_st):
         # Data with high youth population
         data = pd.DataFrame({
             'country': ['KEN'] * 4,
@@ -149,12 +249,12 @@ class TestPublicHealthInsights:
             'population': [1000, 950, 800, 750]  # Very high youth numbers
         })
         
-        insights = get_public_health_insights(data, "KEN", ['0-4', '5-9', '10-14'], "All")
+        get_public_health_insights(calculate_demographic_metrics(data), "KEN", ['0-4', '5-9', '10-14'], "All")
         
-        # Should mention youth population
-        assert "Youth" in insights or "young" in insights.lower()
+        # Should flag the youthful population
+        assert "Youthful Population" in self._rendered_text(mock_st)
 
-    def test_get_public_health_insights_elderly(self):
+    def test_get_public_health_insights_elderly(self, mock_st):
         # Data with significant elderly population
         data = pd.DataFrame({
             'country': ['KEN'] * 6,
@@ -164,10 +264,149 @@ class TestPublicHealthInsights:
             'population': [300, 280, 200, 180, 100, 50]  # High elderly relative to working age
         })
         
-        insights = get_public_health_insights(data, "KEN", ['60-64', '65-69', '70-74', '75-79', '80+'], "All")
+        get_public_health_insights(calculate_demographic_metrics(data), "KEN", ['60-64', '65-69', '70-74', '75-79', '80+'], "All")
+        
+        # Should flag the aging population
+        rendered = self._rendered_text(mock_st)
+        assert "Aging Society" in rendered
+        assert "Elderly Care" in rendered
+
+    def test_get_public_health_insights_zero_population(self, mock_st):
+        data = pd.DataFrame({'age_group': ['0-4', '0-4'], 'sex': ['M', 'F'], 'population': [0, 0]})
+        
+        get_public_health_insights(calculate_demographic_metrics(data), "KEN", ['0-4'], "All")
+        
+        mock_st.info.assert_called_once()
+        mock_st.tabs.assert_not_called()
+
+class TestDemographicMetrics:
+    
+    @pytest.fixture
+    def metrics_data(self):
+        return pd.DataFrame({
+            'age_group': ['0-4', '0-4', '20-24', '20-24', '60-64', '60-64'],
+            'sex': ['M', 'F', 'M', 'F', 'M', 'F'],
+            'population': [100, 100, 300, 300, 50, 150]
+        })
+
+    def testcalculate_demographic_metrics(self, metrics_data):
+        metrics = calculate_demographic_metrics(metrics_data)
+        
+        assert metrics.total_population == 1000
+        assert metrics.child_percentage == pytest.approx(20.0)
+        assert metrics.working_percentage == pytest.approx(60.0)
+        assert metrics.elderly_percentage == pytest.approx(20.0)
+        assert metrics.sex_ratio == pytest.approx(450 / 550)
+        assert metrics.dependency_ratio == pytest.approx(400 / 600)
+
+    def test_calculate_demographic_metrics_python_types(self, metrics_data):
+        # Integer counts stay ints; float estimates come back as Python floats
+        metrics = calculate_demographic_metrics(metrics_data)
+        assert type(metrics.total_population) is int
+        assert type(metrics.male_population) is int
+        assert type(metrics.sex_ratio) is float
+        
+        float_data = metrics_data.astype({'population': 'float32'})
+        metrics = calculate_demographic_metrics(float_data)
+        assert all(type(value) is float for value in metrics)
+        assert metrics.total_population == 1000.0
+
+    def testcalculate_demographic_metrics_unknown_age_group(self, metrics_data):
+        # Rows with an unrecognised age group count towards the total only
+        extra = pd.DataFrame({'age_group': ['unknown'], 'sex': ['M'], 'population': [1000]})
+        metrics = calculate_demographic_metrics(pd.concat([metrics_data, extra], ignore_index=True))
+        
+        assert metrics.total_population == 2000
+        assert metrics.child_percentage == pytest.approx(10.0)
+        assert metrics.male_population == 1450
+
+class TestSampleData:
+    
+    def test_load_sample_data_shape(self):
+        sample_data = load_sample_data()
+        
+        assert list(sample_data.columns) == ['district', 'age_group', 'sex', 'population', 'country']
+        assert sample_data['population'].dtype == 'int32'
+        # 5 districts × 6 age groups × 2 sexes per country
+        assert sample_data['country'].value_counts().to_dict() == {'KEN': 60, 'UGA': 60}
+        assert (sample_data.groupby('country', observed=True)['district'].nunique() == 5).all()
+
+    def test_load_sample_data_values(self):
+        sample_data = load_sample_data()
+        kenya = sample_data[sample_data['country'] == 'KEN']
+        
+        first = kenya.iloc[0]
+        assert (first['district'], first['age_group'], first['sex']) == ('Nairobi', '0-4', 'M')
+        assert first['population'] == int(400000 * 1.1)
+        
+        last = kenya.iloc[-1]
+        assert (last['district'], last['age_group'], last['sex']) == ('Eldoret', '25-29', 'F')
+        assert last['population'] == int(68000 * 0.6)
+        
+        uganda_first = sample_data[sample_data['country'] == 'UGA'].iloc[0]
+        assert uganda_first['district'] == 'Kampala'
+        assert uganda_first['population'] == int(350000 * 1.1)
+
+    def test_sample_data_categorical_columns(self):
+        all_data = load_sample_data()
+        
+        for col in ['country', 'district', 'age_group', 'sex']:
+            assert isinstance(all_data[col].dtype, pd.CategoricalDtype)
+        # Age groups sort in age order rather than lexically
+        assert all_data['age_group'].cat.ordered
+        assert all_data.sort_values('age_group')['age_group'].iloc[-1] == '25-29'
+
+    def test_get_filtered_data(self):
+        filtered = get_filtered_data('UGA', ('0-4', '5-9'), 'F')
+        
+        assert len(filtered) == 10  # 5 districts × 2 age groups
+        assert (filtered['country'] == 'UGA').all()
+        assert (filtered['sex'] == 'F').all()
+        assert set(filtered['age_group']) == {'0-4', '5-9'}
+
+    def test_get_filtered_data_all(self):
+        filtered = get_filtered_data('All', (), 'All')
+        
+        assert len(filtered) == len(load_sample_data()) == 120
+
+    @patch('streamlit.session_state', new_callable=dict)
+    def test_get_session_filtered_data(self, mock_session_state):
+        first = get_session_filtered_data(('KEN', (), 'All'))
+        assert mock_session_state['filter_key'] == ('KEN', (), 'All')
+        
+        # Same selection returns the frame held in session state
+        assert get_session_filtered_data(('KEN', (), 'All')) is first
+        
+        # A new selection replaces it
+        second = get_session_filtered_data(('UGA', (), 'All'))
+        assert second is not first
+        assert (second['country'] == 'UGA').all()
+
+    def test_summarize_population(self):
+        all_data = load_sample_data()
+        totals = summarize_population(all_data)
+        
+        assert list(totals.index.names) == ['country', 'district', 'age_group', 'sex']
+        assert totals.sum() == all_data['population'].sum()
+        assert totals[('KEN', 'Nairobi', '0-4', 'M')] == int(400000 * 1.1)
+
+    def test_get_chart_figures(self):
+        figures = get_chart_figures('KEN', (), 'All')
+        
+        assert len(figures) == 3
+        for fig in figures:
+            assert isinstance(fig, dict)
+            assert 'data' in fig and 'layout' in fig
+
+    def test_get_population_metrics(self):
+        metrics = get_population_metrics('KEN', ('0-4', '5-9'), 'All')
+        expected = get_filtered_data('KEN', ('0-4', '5-9'), 'All')['population'].sum()
+        
+        assert metrics.total_population == expected
+        assert metrics.child_percentage == pytest.approx(100.0)
         
-        # Should mention elderly population
-        assert "Elderly" in insights or "aging" in insights.lower()
+        # A selection matching no rows has no metrics
+        assert get_population_metrics('KEN', ('80+',), 'All') is None
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
\ No newline at end of file
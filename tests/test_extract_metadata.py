@@ -7,6 +7,7 @@ from data_pipeline.extract_metadata import (
     extract_country_from_url,
     validate_metadata,
     create_metadata_summary,
+    collect_raster_metadata,
     export_metadata_to_csv
 )
 
@@ -133,6 +134,31 @@ class TestMetadataExtraction:
         assert summary['age_groups'] == []
         assert summary['failed_rasters'] == []
 
+    def test_collect_raster_metadata(self):
+        raster_data = {
+            'KEN': {
+                'M': {
+                    '0_4': {
+                        'data': Mock(shape=(100, 100)),
+                        'profile': {'crs': 'EPSG:4326', 'width': 100, 'height': 100},
+                        'bounds': Mock(left=30, bottom=0, right=40, top=10)
+                    },
+                    '5_9': {
+                        'data': None,
+                        'profile': {},
+                        'bounds': None
+                    }
+                }
+            }
+        }
+        
+        summary, metadata_table = collect_raster_metadata(raster_data)
+        
+        assert summary == create_metadata_summary(raster_data)
+        assert list(metadata_table['age_group']) == ['0_4', '5_9']
+        assert list(metadata_table['data_loaded']) == [True, False]
+        assert metadata_table.loc[0, 'left'] == 30
+
     @patch('pandas.DataFrame.to_csv')
     def test_export_metadata_to_csv(self, mock_to_csv, test_output_dir):
         # Mock raster data
@@ -5,7 +5,8 @@ from unittest.mock import Mock, patch, MagicMock
 import tempfile
 from pathlib import Path
 
-from data_pipeline.load_rasters import RasterLoader
+from data_pipeline.load_rasters import RasterLoader, RasterBlocks
+from data_pipeline.cache_utils import generate_cache_key
 from data_pipeline.config import COUNTRIES, AGE_GROUPS, SEX_OPTIONS
 
 class TestRasterLoader:
@@ -13,6 +14,13 @@ class TestRasterLoader:
     def test_initialization(self, test_cache_dir):
         loader = RasterLoader(cache_dir=test_cache_dir)
         assert loader.cache_dir == test_cache_dir
+
+    def test_initialization_creates_no_directories(self, tmp_path):
+        # Directories are created by the pipeline entrypoint and on download
+        with patch('pathlib.Path.mkdir') as mock_mkdir:
+            RasterLoader(cache_dir=tmp_path / "cache", stream=True)
+        
+        mock_mkdir.assert_not_called()
         
     def test_get_raster_url(self):
         loader = RasterLoader()
@@ -28,7 +36,7 @@ class TestRasterLoader:
 
     @patch('data_pipeline.load_rasters.download_file')
     @patch('data_pipeline.load_rasters.get_cached_file')
-    def test_load_raster_success(self, mock_get_cached, mock_download, test_cache_dir):
+    def test_load_raster_success(self, mock_get_cached, mock_download, tmp_path):
         # Mock cached file
         mock_get_cached.return_value = None
         
@@ -51,7 +59,7 @@ class TestRasterLoader:
             
             mock_download.return_value = Path(tmp_file.name)
             
-            loader = RasterLoader(cache_dir=test_cache_dir)
+            loader = RasterLoader(cache_dir=tmp_path)
             data, profile, bounds = loader.load_raster('KEN', 'M', '0_4')
             
             assert data is not None
@@ -64,6 +72,141 @@ class TestRasterLoader:
             # Clean up
             Path(tmp_file.name).unlink()
 
+    @patch('data_pipeline.load_rasters.download_file')
+    @patch('data_pipeline.load_rasters.get_cached_file')
+    def test_load_raster_array_cache(self, mock_get_cached, mock_download, tmp_path):
+        loader = RasterLoader(cache_dir=tmp_path)
+        cache_key = generate_cache_key(loader.get_raster_url('KEN', 'M', '0_4'))
+        raster_path = tmp_path / f'{cache_key}.tif'
+        with rasterio.open(
+            raster_path,
+            'w',
+            driver='GTiff',
+            height=10,
+            width=10,
+            count=1,
+            dtype='float32',
+            crs='EPSG:4326',
+            transform=rasterio.Affine(0.01, 0.0, 30.0, 0.0, -0.01, 0.0),
+        ) as dst:
+            expected = np.arange(100, dtype='float32').reshape(10, 10)
+            dst.write(expected, 1)
+        mock_get_cached.return_value = raster_path
+        
+        first, _, _ = loader.load_raster('KEN', 'M', '0_4')
+        
+        # The second load maps the cached band instead of decoding the GeoTIFF
+        with patch('rasterio.io.DatasetReader.read') as mock_read:
+            second, profile, _ = loader.load_raster('KEN', 'M', '0_4')
+            mock_read.assert_not_called()
+        
+        # Arrays are named after the GeoTIFF's cache key
+        assert (tmp_path / 'arrays' / f'{cache_key}.npy').exists()
+        assert isinstance(first, np.memmap)
+        assert isinstance(second, np.memmap)
+        np.testing.assert_array_equal(second, expected)
+        assert profile['width'] == 10
+        mock_download.assert_not_called()
+
+    @patch('data_pipeline.load_rasters.download_file')
+    def test_uncached_download_reused(self, mock_download, tmp_path):
+        raster_path = tmp_path / 'M_0_4.tif'
+        with rasterio.open(
+            raster_path,
+            'w',
+            driver='GTiff',
+            height=10,
+            width=10,
+            count=1,
+            dtype='float32',
+            crs='EPSG:4326',
+            transform=rasterio.Affine(0.01, 0.0, 30.0, 0.0, -0.01, 0.0),
+        ) as dst:
+            dst.write(np.ones((10, 10), dtype='float32'), 1)
+        mock_download.return_value = raster_path
+        
+        # Without a cache directory the file is still only downloaded once
+        loader = RasterLoader()
+        assert loader.get_raster_metadata('KEN', 'M', '0_4') is not None
+        data, _, _ = loader.load_raster('KEN', 'M', '0_4')
+        
+        assert data.shape == (10, 10)
+        assert mock_download.call_count == 1
+
+    @patch('data_pipeline.load_rasters.download_file')
+    def test_load_raster_clip_bounds(self, mock_download, tmp_path):
+        raster_path = tmp_path / 'M_0_4.tif'
+        expected = np.arange(100, dtype='float32').reshape(10, 10)
+        with rasterio.open(
+            raster_path,
+            'w',
+            driver='GTiff',
+            height=10,
+            width=10,
+            count=1,
+            dtype='float32',
+            crs='EPSG:4326',
+            transform=rasterio.Affine(0.1, 0.0, 30.0, 0.0, -0.1, 1.0),
+        ) as dst:
+            dst.write(expected, 1)
+        mock_download.return_value = raster_path
+        
+        # Bounds cover columns 2-4 and rows 1-5 of the grid
+        loader = RasterLoader()
+        data, profile, bounds = loader.load_raster(
+            'KEN', 'M', '0_4', clip_bounds=((30.25, 0.45, 30.45, 0.85), 'EPSG:4326')
+        )
+        
+        np.testing.assert_array_equal(data, expected[1:6, 2:5])
+        assert (profile['width'], profile['height']) == (3, 5)
+        assert profile['transform'].c == pytest.approx(30.2)
+        assert profile['transform'].f == pytest.approx(0.9)
+        assert bounds.left == pytest.approx(30.2)
+        assert bounds.bottom == pytest.approx(0.4)
+
+    @patch('data_pipeline.load_rasters.get_cached_file')
+    def test_load_raster_blockwise(self, mock_get_cached, tmp_path):
+        raster_path = tmp_path / 'M_0_4.tif'
+        expected = np.arange(32 * 32, dtype='float32').reshape(32, 32)
+        # Tiled raster so it is read back in several blocks
+        with rasterio.open(
+            raster_path,
+            'w',
+            driver='GTiff',
+            height=32,
+            width=32,
+            count=1,
+            dtype='float32',
+            crs='EPSG:4326',
+            transform=rasterio.Affine(0.1, 0.0, 30.0, 0.0, -0.1, 1.0),
+            tiled=True,
+            blockxsize=16,
+            blockysize=16
+        ) as dst:
+            dst.write(expected, 1)
+        mock_get_cached.return_value = raster_path
+        
+        # Bounds cover columns 10-19 and rows 5-24, spanning all four blocks
+        loader = RasterLoader(cache_dir=tmp_path)
+        data, profile, bounds = loader.load_raster(
+            'KEN', 'M', '0_4', clip_bounds=((31.0, -1.5, 32.0, 0.5), 'EPSG:4326'), blockwise=True
+        )
+        
+        assert isinstance(data, RasterBlocks)
+        assert data.shape == (profile['height'], profile['width']) == (20, 10)
+        
+        # Blocks are clipped to the window and cover it exactly once
+        blocks = list(data)
+        assert len(blocks) == 4
+        assembled = np.full(data.shape, np.nan, dtype='float32')
+        for window, block in blocks:
+            assert block.shape == (window.height, window.width)
+            assembled[window.toslices()] = block
+        np.testing.assert_array_equal(assembled, expected[5:25, 10:20])
+        
+        # Nothing is decoded into the array cache
+        assert not (tmp_path / 'arrays').exists()
+
     @patch('data_pipeline.load_rasters.download_file')
     def test_load_raster_failure(self, mock_download, test_cache_dir):
         mock_download.side_effect = Exception("Download failed")
@@ -75,8 +218,23 @@ class TestRasterLoader:
         assert profile is None
         assert bounds is None
 
+    @patch('data_pipeline.load_rasters.rasterio.open')
+    @patch('data_pipeline.load_rasters.download_file')
+    def test_load_raster_stream(self, mock_download, mock_open, test_cache_dir):
+        src = mock_open.return_value.__enter__.return_value
+        src.read.return_value = np.ones((10, 10), dtype='float32')
+        
+        loader = RasterLoader(cache_dir=test_cache_dir, stream=True)
+        data, profile, bounds = loader.load_raster('KEN', 'M', '0_4')
+        
+        # Streaming reads the remote file in place instead of downloading it
+        assert data.shape == (10, 10)
+        mock_download.assert_not_called()
+        mock_open.assert_called_once_with(f"/vsicurl/{loader.get_raster_url('KEN', 'M', '0_4')}")
+
+    @patch('data_pipeline.load_rasters.download_many')
     @patch('data_pipeline.load_rasters.RasterLoader.load_raster')
-    def test_batch_load_rasters(self, mock_load_raster, test_cache_dir):
+    def test_batch_load_rasters(self, mock_load_raster, mock_download_many, test_cache_dir):
         # Mock successful raster loading
         mock_load_raster.return_value = (
             np.ones((10, 10), dtype='float32'),
@@ -96,6 +254,49 @@ class TestRasterLoader:
         assert '0_4' in results['KEN']['M']
         assert results['KEN']['M']['0_4']['data'] is not None
         assert mock_load_raster.call_count == 1
+        
+        # Missing rasters are prefetched in one concurrent batch
+        mock_download_many.assert_called_once_with(
+            [loader.get_raster_url('KEN', 'M', '0_4')], test_cache_dir
+        )
+
+    @patch('data_pipeline.load_rasters.RasterLoader.load_raster')
+    def test_batch_load_rasters_parallel(self, mock_load_raster):
+        # Every raster except UGA F 5_9 loads
+        def fake_load(country, sex, age_group, clip_bounds=None, gdal_threads=None, blockwise=False):
+            if (country, sex, age_group) == ('UGA', 'F', '5_9'):
+                return None, None, None
+            return np.full((2, 2), len(age_group), dtype='float32'), {'crs': 'EPSG:4326'}, None
+        
+        mock_load_raster.side_effect = fake_load
+        
+        loader = RasterLoader()
+        results = loader.batch_load_rasters(
+            countries=['KEN', 'UGA'],
+            age_groups=['0_4', '5_9', '80_plus'],
+            sex_options=['M', 'F'],
+            max_workers=4
+        )
+        
+        assert mock_load_raster.call_count == 12
+        assert list(results['KEN']['M']) == ['0_4', '5_9', '80_plus']
+        assert list(results['UGA']['F']) == ['0_4', '80_plus']
+        assert results['KEN']['F']['80_plus']['data'][0, 0] == len('80_plus')
+
+    @patch('data_pipeline.load_rasters.os.cpu_count', return_value=8)
+    @patch('data_pipeline.load_rasters.RasterLoader.load_raster')
+    def test_batch_load_rasters_splits_gdal_threads(self, mock_load_raster, mock_cpu_count):
+        mock_load_raster.return_value = (None, None, None)
+        loader = RasterLoader()
+        
+        # Four workers share eight CPUs
+        loader.batch_load_rasters(countries=['KEN'], age_groups=['0_4', '5_9'], max_workers=4)
+        assert {call.kwargs['gdal_threads'] for call in mock_load_raster.call_args_list} == {2}
+        
+        # More workers than CPUs still leaves each load one thread
+        mock_load_raster.reset_mock()
+        loader.batch_load_rasters(countries=['KEN', 'UGA'], age_groups=['0_4', '5_9', '10_14'], max_workers=16)
+        assert {call.kwargs['gdal_threads'] for call in mock_load_raster.call_args_list} == {1}
 
     def test_batch_load_rasters_empty(self, test_cache_dir):
         loader = RasterLoader(cache_dir=test_cache_dir)
@@ -4,6 +4,7 @@ import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Polygon
 from unittest.mock import Mock, patch, MagicMock
+from affine import Affine
 
 from data_pipeline.summarize_by_district import DistrictSummarizer
 
@@ -41,7 +42,8 @@ class TestDistrictSummarizer:
         """Create sample raster profile"""
         return {
             'crs': 'EPSG:4326',
-            'transform': Mock(a=0.1, b=0.0, c=0.0, d=0.0, e=-0.1, f=0.0),
+            # 10x10 grid spanning both districts: x 0..2, y 0..1
+            'transform': Affine(0.2, 0.0, 0.0, 0.0, -0.1, 1.0),
             'width': 10,
             'height': 10,
             'nodata': -9999
@@ -71,40 +73,31 @@ class TestDistrictSummarizer:
         summarizer = DistrictSummarizer()
         assert summarizer.admin_boundaries == {}
 
-    @patch('rasterio.features.geometry_mask')
-    def test_summarize_raster_by_districts(self, mock_geometry_mask, 
+    def test_load_admin_boundaries_cached(self, sample_districts_gdf, tmp_path):
+        source = tmp_path / 'gadm41_TEST_2.json'
+        sample_districts_gdf.rename(columns={'district': 'NAME_2'}).to_file(source, driver='GeoJSON')
+        cache_dir = tmp_path / 'cache'
+        
+        with patch('data_pipeline.summarize_by_district.GADM_FILES', {'TEST': source}):
+            DistrictSummarizer(cache_dir=cache_dir)
+            
+            # The second load is served from the GeoParquet copy
+            with patch('geopandas.read_file', side_effect=AssertionError('source parsed again')):
+                summarizer = DistrictSummarizer(cache_dir=cache_dir)
+        
+        assert (cache_dir / 'gadm41_TEST_2.parquet').exists()
+        assert list(summarizer.admin_boundaries['TEST']['district']) == ['District 1', 'District 2']
+
+    @patch('data_pipeline.summarize_by_district.rasterize')
+    def test_summarize_raster_by_districts(self, mock_rasterize, 
                                          sample_districts_gdf,
                                          sample_raster_data,
                                          sample_raster_profile):
-        # Mock the geometry mask
-        mock_geometry_mask.side_effect = [
-            # First district mask
-            np.array([
-                [False, False, False, False, False, False, False, False, False, False],
-                [False, False, False, False, False, False, False, False, False, False],
-                [False, False, True,  True,  True,  False, False, False, False, False],
-                [False, False, True,  True,  True,  False, False, False, False, False],
-                [False, False, True,  True,  True,  False, False, False, False, False],
-                [False, False, False, False, False, False, False, False, False, False],
-                [False, False, False, False, False, False, False, False, False, False],
-                [False, False, False, False, False, False, False, False, False, False],
-                [False, False, False, False, False, False, False, False, False, False],
-                [False, False, False, False, False, False, False, False, False, False]
-            ]),
-            # Second district mask
-            np.array([
-                [False, False, False, False, False, False, False, False, False, False],
-                [False, False, False, False, False, False, False, False, False, False],
-                [False, False, False, False, False, False, False, False, False, False],
-                [False, False, False, False, False, False, False, False, False, False],
-                [False, False, False, False, False, False, False, False, False, False],
-                [False, False, False, False, False, False, False, False, False, False],
-                [False, False, False, False, False, False, True,  True,  True,  False],
-                [False, False, False, False, False, False, True,  True,  True,  False],
-                [False, False, False, False, False, False, True,  True,  True,  False],
-                [False, False, False, False, False, False, False, False, False, False]
-            ])
-        ]
+        # Mock the district label raster: 1 and 2 mark each district's pixels
+        labels = np.zeros((10, 10), dtype='int32')
+        labels[2:5, 2:5] = 1
+        labels[6:9, 6:9] = 2
+        mock_rasterize.return_value = labels
         
         summarizer = DistrictSummarizer()
         summarizer.admin_boundaries = {'TEST': sample_districts_gdf}
@@ -114,6 +107,7 @@ class TestDistrictSummarizer:
         )
         
         assert result is not None
+        assert not isinstance(result, gpd.GeoDataFrame)
         assert len(result) == 2
         assert 'district_id' in result.columns
         assert 'population' in result.columns
@@ -123,6 +117,128 @@ class TestDistrictSummarizer:
         populations = result['population'].values
         assert populations[0] == 900  # 3x3 area with 100 each = 900
         assert populations[1] == 1800  # 3x3 area with 200 each = 1800
+        assert list(result['pixel_count']) == [9, 9]
+
+    @patch('data_pipeline.summarize_by_district.rasterize')
+    def test_summarize_raster_by_districts_nodata(self, mock_rasterize,
+                                                 sample_districts_gdf,
+                                                 sample_raster_data,
+                                                 sample_raster_profile):
+        labels = np.zeros((10, 10), dtype='int32')
+        labels[2:5, 2:5] = 1
+        labels[6:9, 6:9] = 2
+        mock_rasterize.return_value = labels
+        
+        # One nodata pixel inside the first district
+        sample_raster_data[3, 3] = -9999
+        
+        summarizer = DistrictSummarizer()
+        summarizer.admin_boundaries = {'TEST': sample_districts_gdf}
+        
+        result = summarizer.summarize_raster_by_districts(sample_raster_data, sample_raster_profile, 'TEST')
+        
+        assert list(result['population']) == [800, 1800]
+        assert list(result['pixel_count']) == [8, 9]
+
+    @patch('data_pipeline.summarize_by_district.rasterize')
+    def test_summarize_raster_by_districts_blockwise(self, mock_rasterize,
+                                                    sample_districts_gdf,
+                                                    sample_raster_data,
+                                                    sample_raster_profile):
+        from rasterio.windows import Window
+        
+        labels = np.zeros((10, 10), dtype='int32')
+        labels[2:5, 2:5] = 1
+        labels[6:9, 6:9] = 2
+        mock_rasterize.return_value = labels
+        
+        # Feed the raster as two horizontal blocks, with one nodata pixel
+        sample_raster_data[3, 3] = -9999
+        blocks = [
+            (Window(0, 0, 10, 4), sample_raster_data[0:4]),
+            (Window(0, 4, 10, 6), sample_raster_data[4:10])
+        ]
+        
+        summarizer = DistrictSummarizer()
+        summarizer.admin_boundaries = {'TEST': sample_districts_gdf}
+        
+        result = summarizer.summarize_raster_by_districts(iter(blocks), sample_raster_profile, 'TEST')
+        
+        assert list(result['population']) == [800, 1800]
+        assert list(result['pixel_count']) == [8, 9]
+
+    @patch('data_pipeline.summarize_by_district.rasterize')
+    def test_summarize_raster_reuses_labels(self, mock_rasterize,
+                                            sample_districts_gdf,
+                                            sample_raster_data,
+                                            sample_raster_profile):
+        labels = np.zeros((10, 10), dtype='int32')
+        labels[2:5, 2:5] = 1
+        labels[6:9, 6:9] = 2
+        mock_rasterize.return_value = labels
+        
+        summarizer = DistrictSummarizer()
+        summarizer.admin_boundaries = {'TEST': sample_districts_gdf}
+        
+        # Rasters on the same grid share one label raster
+        for _ in range(3):
+            summarizer.summarize_raster_by_districts(sample_raster_data, sample_raster_profile, 'TEST')
+        
+        assert mock_rasterize.call_count == 1
+        
+        # Replacing the country's boundaries invalidates its labels
+        summarizer.admin_boundaries['TEST'] = sample_districts_gdf.copy()
+        summarizer.summarize_raster_by_districts(sample_raster_data, sample_raster_profile, 'TEST')
+        
+        assert mock_rasterize.call_count == 2
+
+    @patch('data_pipeline.summarize_by_district.rasterize')
+    def test_summarize_raster_reprojects_once(self, mock_rasterize,
+                                              sample_districts_gdf,
+                                              sample_raster_data,
+                                              sample_raster_profile):
+        mock_rasterize.return_value = np.zeros((10, 10), dtype='int32')
+        
+        summarizer = DistrictSummarizer()
+        summarizer.admin_boundaries = {'TEST': sample_districts_gdf.to_crs('EPSG:3857')}
+        
+        with patch.object(gpd.GeoDataFrame, 'to_crs', wraps=summarizer.admin_boundaries['TEST'].to_crs) as mock_to_crs:
+            for _ in range(3):
+                summarizer.summarize_raster_by_districts(sample_raster_data, sample_raster_profile, 'TEST')
+        
+        assert mock_to_crs.call_count == 1
+
+    def test_summarize_raster_clips_to_district_bounds(self, sample_districts_gdf):
+        # Raster extends well beyond the districts: x 0..4, y -1..1
+        profile = {
+            'crs': 'EPSG:4326',
+            'transform': Affine(0.2, 0.0, 0.0, 0.0, -0.1, 1.0),
+            'width': 20,
+            'height': 20,
+            'nodata': -9999
+        }
+        data = np.ones((20, 20), dtype='float32')
+        
+        summarizer = DistrictSummarizer()
+        summarizer.admin_boundaries = {'TEST': sample_districts_gdf}
+        
+        result = summarizer.summarize_raster_by_districts(data, profile, 'TEST')
+        
+        # Labels only cover the 10x10 window holding the districts
+        _, clip_window, labels = next(iter(summarizer._label_cache.values()))
+        assert labels.shape == (10, 10)
+        assert (clip_window.col_off, clip_window.row_off) == (0, 0)
+        assert list(result['population']) == [50, 50]
+        assert list(result['pixel_count']) == [50, 50]
+
+    def test_get_district_bounds(self, sample_districts_gdf):
+        summarizer = DistrictSummarizer()
+        summarizer.admin_boundaries = {'TEST': sample_districts_gdf}
+        
+        bounds, crs = summarizer.get_district_bounds()['TEST']
+        
+        assert bounds == (0.0, 0.0, 2.0, 1.0)
+        assert crs == 'EPSG:4326'
 
     def test_summarize_raster_no_boundaries(self, sample_raster_data, sample_raster_profile):
         summarizer = DistrictSummarizer()
@@ -162,6 +278,39 @@ class TestDistrictSummarizer:
         assert '0_4' in results['KEN']['M']
         assert mock_summarize.called
 
+    @patch('data_pipeline.summarize_by_district.rasterize')
+    def test_batch_summarize_rasters_shares_labels(self, mock_rasterize,
+                                                   sample_districts_gdf,
+                                                   sample_raster_data,
+                                                   sample_raster_profile):
+        labels = np.zeros((10, 10), dtype='int32')
+        labels[2:5, 2:5] = 1
+        labels[6:9, 6:9] = 2
+        mock_rasterize.return_value = labels
+        
+        age_groups = ['0_4', '5_9', '10_14', '15_19']
+        raster_data = {
+            'TEST': {
+                sex: {
+                    age_group: {'data': sample_raster_data, 'profile': sample_raster_profile, 'bounds': None}
+                    for age_group in age_groups
+                }
+                for sex in ['M', 'F']
+            }
+        }
+        raster_data['TEST']['F']['5_9']['data'] = None
+        
+        summarizer = DistrictSummarizer()
+        summarizer.admin_boundaries = {'TEST': sample_districts_gdf}
+        
+        results = summarizer.batch_summarize_rasters(raster_data)
+        
+        # Labels are built once and reused; order follows the input
+        assert mock_rasterize.call_count == 1
+        assert list(results['TEST']['M']) == age_groups
+        assert list(results['TEST']['F']) == ['0_4', '10_14', '15_19']
+        assert list(results['TEST']['F']['15_19']['population']) == [900, 1800]
+
     def test_create_combined_summary(self):
         # Create sample district summaries
         summaries = {
@@ -196,6 +345,8 @@ class TestDistrictSummarizer:
         assert 'sex' in combined.columns
         assert 'age_group' in combined.columns
         assert 'population' in combined.columns
+        assert combined['population'].dtype == 'float32'
+        assert combined['age_group'].dtype == 'category'
 
     def test_create_combined_summary_empty(self):
         summarizer = DistrictSummarizer()
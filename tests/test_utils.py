@@ -0,0 +1,70 @@
+import pytest
+import pandas as pd
+
+from data_pipeline.utils import save_dataframe, save_population_table, load_population_table
+
+class TestPopulationTable:
+    
+    @pytest.fixture
+    def combined_summary(self):
+        return pd.DataFrame({
+            'country': ['KEN', 'KEN', 'KEN', 'UGA', 'UGA', 'UGA'],
+            'district': ['Nairobi', 'Nairobi', 'Mombasa', 'Kampala', 'Kampala', 'Gulu'],
+            'age_group': ['0-4', '5-9', '0-4', '0-4', '5-9', '0-4'],
+            'sex': ['M', 'F', 'F', 'M', 'M', 'F'],
+            'population': [1000, 1100, 800, 1500, 1600, 700]
+        })
+
+    def test_population_table_round_trip(self, tmp_path, combined_summary):
+        file_path = tmp_path / "population.parquet"
+        save_population_table(combined_summary, file_path)
+        
+        loaded = load_population_table(file_path)
+        
+        assert len(loaded) == len(combined_summary)
+        assert list(loaded.columns) == list(combined_summary.columns)
+        for column in ('country', 'district', 'age_group', 'sex'):
+            assert isinstance(loaded[column].dtype, pd.CategoricalDtype)
+        assert loaded['population'].tolist() == combined_summary['population'].tolist()
+
+    def test_load_population_table_filters(self, tmp_path, combined_summary):
+        file_path = tmp_path / "population.parquet"
+        save_population_table(combined_summary, file_path)
+        
+        loaded = load_population_table(
+            file_path, country='KEN', age_groups=['0-4'], sex='F',
+            columns=['district', 'age_group', 'population']
+        )
+        
+        assert list(loaded.columns) == ['district', 'age_group', 'population']
+        assert loaded['district'].astype(str).tolist() == ['Mombasa']
+        assert loaded['population'].tolist() == [800]
+        assert isinstance(loaded['age_group'].dtype, pd.CategoricalDtype)
+
+    def test_load_population_table_no_match(self, tmp_path, combined_summary):
+        file_path = tmp_path / "population.parquet"
+        save_population_table(combined_summary, file_path)
+        
+        loaded = load_population_table(file_path, country='UGA', age_groups=['5-9'], sex='F')
+        
+        assert loaded.empty
+
+
+class TestSaveDataframe:
+    
+    def test_save_dataframe_defaults_to_csv(self, tmp_path):
+        df = pd.DataFrame({'district': ['Nairobi', 'Mombasa'], 'population': [1000, 800]})
+        file_path = tmp_path / "table.csv"
+        
+        save_dataframe(df, file_path)
+        
+        assert file_path.read_text().splitlines()[0] == "district,population"
+        pd.testing.assert_frame_equal(pd.read_csv(file_path), df)
+
+    def test_save_dataframe_parquet(self, tmp_path):
+        df = pd.DataFrame({'district': ['Nairobi', 'Mombasa'], 'population': [1000, 800]})
+        file_path = tmp_path / "table.parquet"
+        
+        save_dataframe(df, file_path, format='parquet')
+        
+        pd.testing.assert_frame_equal(pd.read_parquet(file_path), df)